@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+KCET Extraction Benchmark
+Generates KCET-shaped synthetic workbooks and times each stage of the
+extraction pipeline on them, so changes can be compared without the real files.
+
+Stages:
+  read     stream sheets out of the workbook into DataFrames
+  detect   college banner + header row detection (segment_sheet, one sweep)
+  parse    per-college block parsing, branch mapping included (cold cache)
+  branch   map_branch over every data row's course name (cold cache)
+  write    sharded NDJSON output of the extracted records
+
+Each stage reports wall time (best of --repeat), rows per second and the
+tracemalloc peak from a separate, untimed pass. Results are saved as JSON and
+compared with the previous run of the same configuration.
+
+The extractor only recognises the 2025-style "College:" banners, so sheets in
+the 2023/2024 layouts add to read and detect cost but yield no records.
+
+Usage:
+  python scripts/bench_extract.py --colleges 200 --sheets 60 --layouts 2023,2024,2025
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+from openpyxl import Workbook
+
+import extract_excel_cutoffs as extractor
+
+STAGES = ['read', 'detect', 'parse', 'branch', 'write']
+LAYOUTS = ['2023', '2024', '2025']
+CATEGORIES = list(extractor.CATEGORY_MAPPING)
+
+# Short "CODE Name" course labels used by the 2023/2024 layouts
+SHORT_COURSES = [
+    'AI Artificial\nIntelligence', 'CE Civil', 'CS Computers', 'EC Electronics', 'EE Electrical',
+    'IE Info.Science', 'ME Mechanical', 'BT Bio Technology', 'CH Chemical', 'ET Elec.\nTelecommn. Engg.',
+    'DS Comp. Sc. Engg-\nData Sc.', 'CY Comp. Sc. Engg-\nCyber Security', 'RA Robotics and\nAutomation',
+]
+
+# Full course names used by the 2025 layout, including a few the mapping does not know
+LONG_COURSES = list(dict.fromkeys(extractor.BRANCH_MAPPING)) + [
+    'ARTIFICIAL INTELLIGENCE AND DATA SCIENCE', 'ELECTRONICS AND TELECOMMUNICAT ION ENGINEERING',
+    'COMPUTER SCIENCE AND ENGINEERING(DAT A SCIENCE)', 'B TECH IN COMPUTER SCIENCE AND ENGINEERING',
+    'INDUSTRIAL IOT', 'ENGINEERING DESIGN',
+]
+
+def rank_cell(rng: random.Random) -> Any:
+    """A cutoff cell: mostly ranks (some fractional), otherwise '--'"""
+    roll = rng.random()
+    if roll < 0.35:
+        return '--'
+    if roll < 0.45:
+        return rng.randint(1, 200000) + 0.5
+    return rng.randint(1, 200000)
+
+def write_college(sheet, layout: str, code: str, name: str, categories: List[str],
+                  courses: List[str], rng: random.Random, first_on_sheet: bool, wrap_address: bool = False):
+    """Append one college block in the given layout"""
+    if layout == '2025':
+        # Long addresses wrap onto a second line of the banner cell, as in the real 2025 workbook
+        address = 'MAIN ROAD,\nBANGALORE' if wrap_address else 'MAIN ROAD, BANGALORE'
+        sheet.append([f"College: {code} {name} {address}"])
+        sheet.append(['Course Name'] + categories)
+    elif layout == '2023' and first_on_sheet:
+        sheet.append([f"ENGINEERING\xa0CUTOFF\xa0RANK\xa0OF\xa0CET-2023\n{code}\xa0\xa0{name.replace(' ', chr(0xa0))}"])
+        sheet.append([None] + categories)
+    else:
+        sheet.append([f"{code}\xa0\xa0{name.replace(' ', chr(0xa0))}"])
+        sheet.append([None] + categories)
+    for course in courses:
+        sheet.append([course] + [rank_cell(rng) for _ in categories])
+        if layout != '2025' and rng.random() < 0.2:
+            sheet.append([None] * (len(categories) + 1))
+
+def generate_workbook(path: Path, colleges: int, sheets: int, courses: int, categories: int,
+                      layouts: List[str], seed: int = 0) -> Path:
+    """Write a synthetic KCET cutoff workbook; sheets cycle through the given layouts"""
+    rng = random.Random(seed)
+    workbook = Workbook(write_only=True)
+    category_names = CATEGORIES[:categories]
+    codes = list(extractor.COLLEGE_MAPPING)
+    per_sheet = max(1, -(-colleges // sheets))
+
+    college = 0
+    for sheet_idx in range(sheets):
+        layout = layouts[sheet_idx % len(layouts)]
+        sheet = workbook.create_sheet(f"Table {sheet_idx + 1}")
+        if sheet_idx == 0 and layout == '2025':
+            sheet.append(['KARNATAKA EXAMINATIONS AUTHORITY'])
+            sheet.append(['UGCET ALLOTMENT CUT-OFF RANKS FOR Engineering'])
+            sheet.append(['Seat Type: Rest Of karnataka Cut-Off Ranks'])
+        for n in range(per_sheet):
+            if college >= colleges:
+                break
+            code = codes[college % len(codes)] if college < len(codes) else f"E{college + 1:03d}"
+            pool = LONG_COURSES if layout == '2025' else SHORT_COURSES
+            chosen = sorted(rng.sample(pool, min(courses, len(pool))))
+            write_college(sheet, layout, code, f"Synthetic College {college + 1}", category_names, chosen, rng, n == 0,
+                          wrap_address=college % 7 == 3)
+            college += 1
+    workbook.save(path)
+    return path
+
+def course_names_of(workbooks: List[Path]) -> List[str]:
+    """First-column text of every row, i.e. what map_branch sees per data row"""
+    course_names = []
+    for workbook in workbooks:
+        for _, sheet_rows in extractor.iter_workbook_sheets(str(workbook)):
+            for row in sheet_rows:
+                if row and isinstance(row[0], str) and row[0].strip():
+                    course_names.append(row[0].strip())
+    return course_names
+
+def check_banners(workbooks: List[Path]) -> Tuple[int, int]:
+    """(banner cells, blocks found): segment_sheet must start one block per 'College:' banner"""
+    banners = blocks = 0
+    for workbook in workbooks:
+        for _, sheet_rows in extractor.iter_workbook_sheets(str(workbook)):
+            df = extractor.sheet_to_dataframe(sheet_rows)
+            if df.empty:
+                continue
+            banners += sum(1 for row in df.itertuples(index=False, name=None)
+                           if any(isinstance(value, str) and 'College:' in value for value in row))
+            blocks += len(extractor.segment_sheet(df))
+    return banners, blocks
+
+def run_stages(workbooks: List[Path], out_dir: Path) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """Run the pipeline stage by stage over the workbooks, timing each stage"""
+    timings = {stage: 0.0 for stage in STAGES}
+    rows = {stage: 0 for stage in STAGES}
+    records = []
+
+    extractor.branch_matcher().lookup.cache_clear()
+    for workbook in workbooks:
+        year = '2025'
+        round_type = extractor.determine_round(workbook.name)
+        start = time.perf_counter()
+        frames = [extractor.sheet_to_dataframe(sheet_rows)
+                  for _, sheet_rows in extractor.iter_workbook_sheets(str(workbook))]
+        timings['read'] += time.perf_counter() - start
+
+        for df in frames:
+            if df.empty:
+                continue
+            rows['read'] += len(df)
+            rows['detect'] += len(df)
+
+            start = time.perf_counter()
+            blocks = extractor.segment_sheet(df)
+            timings['detect'] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            for college_code, _, header_idx, block_start, block_end in blocks:
+                if header_idx is None:
+                    continue
+                rows['parse'] += block_end - block_start
+                records.extend(extractor.parse_college_block(df, header_idx, block_start, block_end,
+                                                             college_code, year, round_type))
+            timings['parse'] += time.perf_counter() - start
+
+    # Branch mapping in isolation: one lookup per data row, starting from a cold cache
+    course_names = course_names_of(workbooks)
+    extractor.branch_matcher().lookup.cache_clear()
+    start = time.perf_counter()
+    for course_name in course_names:
+        extractor.map_branch(course_name)
+    timings['branch'] = time.perf_counter() - start
+    rows['branch'] = len(course_names)
+
+    start = time.perf_counter()
+    writer = extractor.ShardedWriter(out_dir)
+    writer.write(records)
+    writer.close({'total_entries': len(records)})
+    timings['write'] = time.perf_counter() - start
+    rows['write'] = len(records)
+
+    return {stage: {'seconds': timings[stage], 'rows': rows[stage]} for stage in STAGES}, len(records)
+
+def measure_memory(workbooks: List[Path], out_dir: Path) -> Dict[str, int]:
+    """tracemalloc peak (bytes above the starting point) of each stage, from an untimed pass"""
+    peaks = {stage: 0 for stage in STAGES}
+
+    def traced(stage: str, func, *args):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        result = func(*args)
+        peaks[stage] = max(peaks[stage], tracemalloc.get_traced_memory()[1] - base)
+        return result
+
+    records = []
+    tracemalloc.start()
+    try:
+        extractor.branch_matcher().lookup.cache_clear()
+        for workbook in workbooks:
+            round_type = extractor.determine_round(workbook.name)
+            frames = traced('read', lambda: [extractor.sheet_to_dataframe(sheet_rows)
+                                             for _, sheet_rows in extractor.iter_workbook_sheets(str(workbook))])
+            for df in frames:
+                if df.empty:
+                    continue
+                blocks = traced('detect', extractor.segment_sheet, df)
+                for college_code, _, header_idx, block_start, block_end in blocks:
+                    if header_idx is not None:
+                        records.extend(traced('parse', extractor.parse_college_block, df, header_idx,
+                                              block_start, block_end, college_code, '2025', round_type))
+
+        course_names = course_names_of(workbooks)
+        extractor.branch_matcher().lookup.cache_clear()
+        traced('branch', lambda: [extractor.map_branch(course_name) for course_name in course_names])
+
+        def write():
+            writer = extractor.ShardedWriter(out_dir)
+            writer.write(records)
+            writer.close({'total_entries': len(records)})
+        traced('write', write)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+def config_key(config: Dict[str, Any]) -> str:
+    """Short stable hash identifying a benchmark configuration"""
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+def previous_result(results_dir: Path, key: str) -> Optional[Dict[str, Any]]:
+    """The most recent saved result for the same configuration"""
+    candidates = sorted(results_dir.glob(f"bench-{key}-*.json"))
+    if not candidates:
+        return None
+    with open(candidates[-1], 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def report(result: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    """Print the per-stage table, with deltas against a baseline result"""
+    print(f"{'stage':<8} {'seconds':>10} {'rows':>9} {'rows/s':>12} {'peak MiB':>9}  vs baseline")
+    for stage in STAGES:
+        current = result['stages'][stage]
+        line = (f"{stage:<8} {current['seconds']:>10.4f} {current['rows']:>9} "
+                f"{current['rows_per_sec']:>12.0f} {current['peak_bytes'] / 2**20:>9.2f}")
+        if baseline and stage in baseline['stages'] and baseline['stages'][stage]['seconds'] > 0:
+            change = current['seconds'] / baseline['stages'][stage]['seconds'] - 1
+            line += f"  {change:+.1%}"
+        print(line)
+    print(f"records: {result['records']}")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Benchmark the KCET extraction pipeline on synthetic workbooks')
+    parser.add_argument('--workbooks', type=int, default=1, help='Number of workbooks to generate (default: 1)')
+    parser.add_argument('--colleges', type=int, default=200, help='Colleges per workbook (default: 200)')
+    parser.add_argument('--sheets', type=int, default=60, help='Sheets per workbook (default: 60)')
+    parser.add_argument('--courses', type=int, default=12, help='Courses per college (default: 12)')
+    parser.add_argument('--categories', type=int, default=len(CATEGORIES),
+                        help=f'Category columns per sheet (default: {len(CATEGORIES)})')
+    parser.add_argument('--layouts', default='2025',
+                        help='Comma-separated layouts to cycle through per sheet: 2023, 2024, 2025 (default: 2025)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs; the best is kept (default: 3)')
+    parser.add_argument('--results-dir', type=Path, default=Path('.cache/bench'),
+                        help='Where results are saved (default: .cache/bench)')
+    parser.add_argument('--baseline', type=Path, default=None,
+                        help='Result file to compare against (default: previous run of the same configuration)')
+    parser.add_argument('--keep-workbooks', type=Path, default=None,
+                        help='Generate the workbooks into this directory and keep them')
+    args = parser.parse_args(argv)
+    args.layouts = [layout.strip() for layout in args.layouts.split(',') if layout.strip()]
+    unknown = [layout for layout in args.layouts if layout not in LAYOUTS]
+    if unknown or not args.layouts:
+        parser.error(f"unknown layouts {unknown}; choose from {', '.join(LAYOUTS)}")
+    return args
+
+def main(argv: Optional[List[str]] = None):
+    """Generate the workbooks, run the stages and save the result"""
+    args = parse_args(argv)
+    extractor.logger.setLevel(logging.ERROR)
+
+    config = {
+        'workbooks': args.workbooks, 'colleges': args.colleges, 'sheets': args.sheets,
+        'courses': args.courses, 'categories': args.categories, 'layouts': args.layouts, 'seed': args.seed
+    }
+    key = config_key(config)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workbook_dir = args.keep_workbooks or Path(tmp) / 'workbooks'
+        workbook_dir.mkdir(parents=True, exist_ok=True)
+        workbooks = [
+            generate_workbook(workbook_dir / f"kcet-2025-round{i + 1}-synthetic.xlsx", args.colleges, args.sheets,
+                              args.courses, args.categories, args.layouts, args.seed + i)
+            for i in range(args.workbooks)
+        ]
+
+        banners, blocks = check_banners(workbooks)
+        if blocks != banners:
+            sys.exit(f"segment_sheet found {blocks} college blocks for {banners} banners")
+
+        best = None
+        for _ in range(max(1, args.repeat)):
+            run, record_count = run_stages(workbooks, Path(tmp) / 'out')
+            best = run if best is None else {
+                stage: min(best[stage], run[stage], key=lambda timing: timing['seconds']) for stage in STAGES
+            }
+        peaks = measure_memory(workbooks, Path(tmp) / 'out')
+
+    result = {
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'config': config,
+        'records': record_count,
+        'stages': {
+            stage: {
+                'seconds': best[stage]['seconds'],
+                'rows': best[stage]['rows'],
+                'rows_per_sec': best[stage]['rows'] / best[stage]['seconds'] if best[stage]['seconds'] else 0.0,
+                'peak_bytes': peaks[stage]
+            }
+            for stage in STAGES
+        }
+    }
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    else:
+        baseline = previous_result(args.results_dir, key)
+    report(result, baseline)
+
+    args.results_dir.mkdir(parents=True, exist_ok=True)
+    out_file = args.results_dir / f"bench-{key}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(out_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved: {out_file}")
+
+if __name__ == "__main__":
+    main()
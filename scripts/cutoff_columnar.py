@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+KCET Columnar Cutoff Format
+Dictionary-encoded, column-oriented storage for the extracted cutoff dataset.
+
+A dataset is a pair of files:
+  <name>.columns.json  header: metadata, lookup tables and column layout
+  <name>.columns.bin   packed little-endian column arrays
+
+String fields are stored as small integer codes into the header's lookup
+tables and ranks as int32, so the binary part is memory-mapped and read
+without copying.
+"""
+
+import json
+import os
+from array import array
+from pathlib import Path
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+FORMAT_NAME = 'kcet-cutoffs-columnar'
+FORMAT_VERSION = 1
+
+# Dictionary-encoded fields, in column order
+CODED_FIELDS = ['institute_code', 'course', 'category', 'year', 'round']
+RANK_FIELD = 'cutoff_rank'
+RANK_DTYPE = '<i4'
+
+# Column offsets are aligned so every column can be viewed in place
+ALIGNMENT = 8
+
+def columnar_paths(path: Union[str, Path]) -> Tuple[Path, Path]:
+    """Header and data file paths for a dataset path such as public/data/cutoffs"""
+    path = Path(path)
+    name = path.name
+    for suffix in ('.columns.json', '.columns.bin'):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    return path.with_name(f"{name}.columns.json"), path.with_name(f"{name}.columns.bin")
+
+def code_dtype(table_size: int) -> str:
+    """Smallest unsigned dtype that can index a lookup table"""
+    if table_size <= 0xFF:
+        return '<u1'
+    if table_size <= 0xFFFF:
+        return '<u2'
+    return '<u4'
+
+class ColumnarWriter:
+    """Encodes records into columns as they arrive and writes the dataset on close"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.header_file, self.data_file = columnar_paths(path)
+        self.tables: Dict[str, Dict[str, int]] = {field: {} for field in CODED_FIELDS}
+        self.codes: Dict[str, array] = {field: array('I') for field in CODED_FIELDS}
+        self.ranks = array('i')
+        self.institutes: Dict[str, str] = {}
+
+    def write(self, records: Iterable[Dict[str, Any]]):
+        """Encode records into the column buffers"""
+        for record in records:
+            for field in CODED_FIELDS:
+                table = self.tables[field]
+                value = record[field]
+                code = table.get(value)
+                if code is None:
+                    code = table[value] = len(table)
+                self.codes[field].append(code)
+            self.ranks.append(record[RANK_FIELD])
+            self.institutes.setdefault(record['institute_code'], record['institute'])
+
+    def encoded_columns(self) -> Dict[str, np.ndarray]:
+        """The buffered columns as numpy arrays in column order"""
+        arrays = {field: np.frombuffer(self.codes[field], dtype=np.uint32).astype(code_dtype(len(self.tables[field])))
+                  for field in CODED_FIELDS}
+        arrays[RANK_FIELD] = np.frombuffer(self.ranks, dtype=np.int32).astype(RANK_DTYPE)
+        return arrays
+
+    def close(self, metadata: Dict[str, Any]) -> Path:
+        """Write the packed columns and the header"""
+        return self.write_arrays(self.encoded_columns(), metadata)
+
+    def write_arrays(self, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any],
+                     extra: Optional[Dict[str, Any]] = None) -> Path:
+        """Write columns (in the writer's encoding) plus optional extra header fields"""
+        self.header_file.parent.mkdir(parents=True, exist_ok=True)
+        count = len(arrays[RANK_FIELD])
+        columns = {}
+        offset = 0
+        tmp_data = self.data_file.with_name(self.data_file.name + '.tmp')
+        with open(tmp_data, 'wb') as f:
+            for field, values in arrays.items():
+                padding = -offset % ALIGNMENT
+                f.write(b'\0' * padding)
+                offset += padding
+                f.write(values.tobytes())
+                columns[field] = {'dtype': values.dtype.str, 'offset': offset, 'count': count}
+                offset += values.nbytes
+
+        lookup = {field: list(self.tables[field]) for field in CODED_FIELDS}
+        header = {
+            'format': FORMAT_NAME,
+            'version': FORMAT_VERSION,
+            'metadata': metadata,
+            'count': count,
+            'data_file': self.data_file.name,
+            'lookup': lookup,
+            'institute_names': [self.institutes[code] for code in lookup['institute_code']],
+            'columns': columns,
+            **(extra or {})
+        }
+        tmp_header = self.header_file.with_name(self.header_file.name + '.tmp')
+        with open(tmp_header, 'w', encoding='utf-8') as f:
+            json.dump(header, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_data, self.data_file)
+        os.replace(tmp_header, self.header_file)
+        return self.header_file
+
+class CutoffColumns:
+    """A loaded columnar dataset; column arrays are read-only views on a memory map"""
+
+    def __init__(self, header: Dict[str, Any], data: np.ndarray):
+        self.header = header
+        self.metadata = header['metadata']
+        self.lookup: Dict[str, List[str]] = header['lookup']
+        self.institute_names: List[str] = header['institute_names']
+        self.columns: Dict[str, np.ndarray] = {}
+        for field, layout in header['columns'].items():
+            self.columns[field] = np.frombuffer(data, dtype=np.dtype(layout['dtype']),
+                                                count=layout['count'], offset=layout['offset'])
+
+    def __len__(self) -> int:
+        return self.header['count']
+
+    def codes(self, field: str) -> np.ndarray:
+        """Integer codes (or ranks) of a column"""
+        return self.columns[field]
+
+    def decode(self, field: str) -> np.ndarray:
+        """Decoded values of a dictionary-encoded column"""
+        table = np.asarray(self.institute_names if field == 'institute' else self.lookup[field], dtype=object)
+        return table[self.columns['institute_code' if field == 'institute' else field]]
+
+    def code_of(self, field: str, value: str) -> int:
+        """Code of a value in a lookup table, or -1 if it does not occur"""
+        try:
+            return self.lookup[field].index(value)
+        except ValueError:
+            return -1
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Rebuild the records in their original form"""
+        institute_codes, courses, categories, years, rounds = (
+            [self.lookup[field][code] for code in self.columns[field].tolist()] for field in CODED_FIELDS
+        )
+        institute_idx = self.columns['institute_code'].tolist()
+        for i, rank in enumerate(self.columns[RANK_FIELD].tolist()):
+            yield {
+                'institute': self.institute_names[institute_idx[i]],
+                'institute_code': institute_codes[i],
+                'course': courses[i],
+                'category': categories[i],
+                'cutoff_rank': rank,
+                'year': years[i],
+                'round': rounds[i]
+            }
+
+def load_columnar(path: Union[str, Path]) -> CutoffColumns:
+    """Load a columnar dataset, memory-mapping its data file"""
+    header_file, data_file = columnar_paths(path)
+    with open(header_file, 'r', encoding='utf-8') as f:
+        header = json.load(f)
+    if header.get('format') != FORMAT_NAME or header.get('version') != FORMAT_VERSION:
+        raise ValueError(f"{header_file} is not a {FORMAT_NAME} v{FORMAT_VERSION} file")
+    data_file = header_file.with_name(header['data_file'])
+    if header['count'] == 0 or data_file.stat().st_size == 0:
+        data = np.zeros(0, dtype=np.uint8)
+    else:
+        data = np.memmap(data_file, dtype=np.uint8, mode='r')
+    return CutoffColumns(header, data)
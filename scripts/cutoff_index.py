@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+KCET Rank Index
+Cutoff records grouped by (category, year, round) and sorted by cutoff rank,
+persisted in the columnar format, with binary-search eligibility queries.
+
+Usage:
+  python scripts/cutoff_index.py --rank 12000 --category GM --year 2025 --round R1
+  python scripts/cutoff_index.py --rank 12000 --category GM --year 2025 --round R1 --nearest 5
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Container, Dict, List, Any, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+from cutoff_columnar import CODED_FIELDS, RANK_FIELD, ColumnarWriter, CutoffColumns, load_columnar
+
+INDEX_NAME = 'rank-index'
+SHARDS_DIR = 'cutoffs'
+
+class RankIndexWriter(ColumnarWriter):
+    """Collects records like ColumnarWriter and writes them sorted into (category, year, round) groups"""
+
+    def close(self, metadata: Dict[str, Any]) -> Path:
+        arrays = self.encoded_columns()
+        order = np.lexsort((arrays[RANK_FIELD], arrays['round'], arrays['year'], arrays['category']))
+        arrays = {field: values[order] for field, values in arrays.items()}
+
+        # Group boundaries are where any of the key columns changes
+        keys = np.stack([arrays['category'], arrays['year'], arrays['round']]).astype(np.int64)
+        starts = [0] + (np.flatnonzero(np.any(keys[:, 1:] != keys[:, :-1], axis=0)) + 1).tolist()
+        ends = starts[1:] + [len(order)]
+        lookup = {field: list(self.tables[field]) for field in CODED_FIELDS}
+        groups = [
+            {
+                'category': lookup['category'][arrays['category'][start]],
+                'year': lookup['year'][arrays['year'][start]],
+                'round': lookup['round'][arrays['round'][start]],
+                'start': start,
+                'end': end
+            }
+            for start, end in zip(starts, ends) if start < end
+        ]
+        return self.write_arrays(arrays, metadata, {'groups': groups})
+
+class RankIndex:
+    """Binary-search queries over a loaded rank index"""
+
+    def __init__(self, columns: CutoffColumns):
+        self.columns = columns
+        self.metadata = columns.metadata
+        self.ranks = columns.codes(RANK_FIELD)
+        self.groups: Dict[Tuple[str, str, str], Tuple[int, int]] = {
+            (group['category'], group['year'], group['round']): (group['start'], group['end'])
+            for group in columns.header['groups']
+        }
+        self._tables = {field: columns.lookup[field] for field in CODED_FIELDS}
+        self._codes = {field: columns.codes(field) for field in CODED_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def record(self, i: int) -> Dict[str, Any]:
+        """The record at a position of the index"""
+        institute_code = int(self._codes['institute_code'][i])
+        return {
+            'institute': self.columns.institute_names[institute_code],
+            'institute_code': self._tables['institute_code'][institute_code],
+            'course': self._tables['course'][self._codes['course'][i]],
+            'category': self._tables['category'][self._codes['category'][i]],
+            'cutoff_rank': int(self.ranks[i]),
+            'year': self._tables['year'][self._codes['year'][i]],
+            'round': self._tables['round'][self._codes['round'][i]]
+        }
+
+    def iter_records(self, skip: Container[Tuple[str, str]] = ()) -> Iterator[Dict[str, Any]]:
+        """Records of every group, except those whose (year, round) is in skip"""
+        for (category, year, round_type), (start, end) in self.groups.items():
+            if (year, round_type) not in skip:
+                for i in range(start, end):
+                    yield self.record(i)
+
+    def group_range(self, category: str, year: str, round_type: str) -> Tuple[int, int]:
+        """[start, end) positions of a (category, year, round) group; empty if absent"""
+        return self.groups.get((category, str(year), round_type), (0, 0))
+
+    def eligible_range(self, rank: int, category: str, year: str, round_type: str) -> Tuple[int, int]:
+        """Positions of the options whose cutoff rank is at or beyond the given rank"""
+        start, end = self.group_range(category, year, round_type)
+        return start + int(np.searchsorted(self.ranks[start:end], rank, side='left')), end
+
+    def eligible(self, rank: int, category: str, year: str, round_type: str,
+                 limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Options a candidate of the given rank could have got, closest cutoff first"""
+        start, end = self.eligible_range(rank, category, year, round_type)
+        if limit is not None:
+            end = min(end, start + limit)
+        return [self.record(i) for i in range(start, end)]
+
+    def count_eligible(self, rank: int, category: str, year: str, round_type: str) -> int:
+        """Number of options a candidate of the given rank could have got"""
+        start, end = self.eligible_range(rank, category, year, round_type)
+        return end - start
+
+    def nearest(self, rank: int, category: str, year: str, round_type: str, k: int = 10) -> List[Dict[str, Any]]:
+        """The k options whose cutoff rank is closest to the given rank, either side"""
+        start, end = self.group_range(category, year, round_type)
+        pivot = start + int(np.searchsorted(self.ranks[start:end], rank, side='left'))
+        below, above = pivot - 1, pivot
+        picked = []
+        while len(picked) < k and (below >= start or above < end):
+            if above >= end or (below >= start and rank - self.ranks[below] <= self.ranks[above] - rank):
+                picked.append(below)
+                below -= 1
+            else:
+                picked.append(above)
+                above += 1
+        return [self.record(i) for i in picked]
+
+def read_shard_index(data_dir: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """The index.json of the sharded dataset, or None if there is none"""
+    index_file = Path(data_dir) / SHARDS_DIR / 'index.json'
+    if not index_file.exists():
+        return None
+    with open(index_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def iter_shard_records(data_dir: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Stream every record of the sharded dataset"""
+    shard_index = read_shard_index(data_dir) or {'shards': []}
+    for shard in shard_index['shards']:
+        with open(Path(data_dir) / SHARDS_DIR / shard['file'], 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def build_rank_index(data_dir: Union[str, Path]) -> Path:
+    """Rebuild the rank index from the sharded dataset"""
+    shard_index = read_shard_index(data_dir)
+    if shard_index is None:
+        raise FileNotFoundError(f"No sharded dataset in {Path(data_dir) / SHARDS_DIR}")
+    writer = RankIndexWriter(Path(data_dir) / INDEX_NAME)
+    writer.write(iter_shard_records(data_dir))
+    return writer.close(shard_index['metadata'])
+
+def load_rank_index(data_dir: Union[str, Path] = 'public/data', rebuild: bool = True) -> RankIndex:
+    """Load the rank index, rebuilding it first if it is missing or older than the dataset"""
+    data_dir = Path(data_dir)
+    try:
+        columns = load_columnar(data_dir / INDEX_NAME)
+    except (OSError, ValueError):
+        columns = None
+
+    # The extractor writes both in the same run; a newer dataset means the index is out of date
+    shard_index = read_shard_index(data_dir)
+    stale = shard_index is not None and (
+        columns is None or shard_index['metadata'].get('last_updated', '') > columns.metadata.get('last_updated', '')
+    )
+    if stale and rebuild:
+        build_rank_index(data_dir)
+        columns = load_columnar(data_dir / INDEX_NAME)
+    if columns is None:
+        raise FileNotFoundError(f"No rank index in {data_dir}; run the extractor first")
+    return RankIndex(columns)
+
+def main(argv: Optional[List[str]] = None):
+    """Answer an eligibility or nearest-cutoff query from the command line"""
+    parser = argparse.ArgumentParser(description='Query the KCET cutoff rank index')
+    parser.add_argument('--data-dir', type=Path, default=Path('public/data'), help='Extractor output directory')
+    parser.add_argument('--rank', type=int, required=True, help='Candidate rank')
+    parser.add_argument('--category', required=True, help='Seat category, e.g. GM, 2AG')
+    parser.add_argument('--year', required=True, help='Cutoff year')
+    parser.add_argument('--round', dest='round_type', default='R1', help='Round: R1, R2, EXT or MOCK (default: R1)')
+    parser.add_argument('--nearest', type=int, default=None, help='Return the N closest cutoffs instead of all eligible options')
+    parser.add_argument('--limit', type=int, default=None, help='Maximum number of eligible options to return')
+    args = parser.parse_args(argv)
+
+    index = load_rank_index(args.data_dir)
+    if args.nearest is not None:
+        results = index.nearest(args.rank, args.category, args.year, args.round_type, args.nearest)
+    else:
+        results = index.eligible(args.rank, args.category, args.year, args.round_type, args.limit)
+    json.dump(results, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write('\n')
+
+if __name__ == "__main__":
+    main()
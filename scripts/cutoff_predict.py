@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+KCET Batch Rank Prediction
+Eligible options for many students at once, vectorized with NumPy over the
+sorted rank index: top-K safe/target/reach options per student, or a full
+student x option eligibility matrix.
+
+Usage:
+  python scripts/cutoff_predict.py --students students.csv --year 2025 --round R1 --top-k 5
+  python scripts/cutoff_predict.py --students students.csv --matrix eligibility.npz --jobs 4
+
+The students CSV needs rank and category columns; an id column is optional.
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+from cutoff_index import RankIndex, load_rank_index
+
+logger = logging.getLogger(__name__)
+
+BANDS = ['safe', 'target', 'reach']
+DEFAULT_MARGIN = 0.1
+DEFAULT_CHUNK_SIZE = 2048
+
+# An option of the eligibility matrix; categories are its columns' rows
+OPTION_FIELDS = ['institute_code', 'course', 'year', 'round']
+
+def take_band(positions: np.ndarray, lo: np.ndarray, hi: np.ndarray, k: int, from_end: bool) -> np.ndarray:
+    """Up to k pool entries of each [lo, hi) slice as a (students, k) array, -1 where there are fewer"""
+    offsets = np.arange(k)
+    picks = hi[:, None] - 1 - offsets if from_end else lo[:, None] + offsets
+    valid = (picks >= lo[:, None]) & (picks < hi[:, None])
+    return np.where(valid, positions[np.clip(picks, 0, len(positions) - 1)], -1)
+
+class BatchPredictor:
+    """Vectorized eligibility queries for arrays of student ranks and categories
+
+    The rank index records of the selected (year, round) groups are pooled per
+    category and sorted by cutoff rank, so every student is one binary search
+    into the pool of their category. With margin m, an option is
+      safe    if its cutoff >= rank * (1 + m)
+      target  if rank <= cutoff < rank * (1 + m)
+      reach   if rank * (1 - m) <= cutoff < rank
+    Safe and target options are listed closest cutoff first, reach options
+    closest to the student's rank first.
+    """
+
+    def __init__(self, index: RankIndex, year: Optional[str] = None, round_type: Optional[str] = None):
+        self.index = index
+        self.year = None if year is None else str(year)
+        self.round_type = round_type
+        self.categories = sorted({category for category, _, _ in index.groups})
+        self.category_codes = {category: i for i, category in enumerate(self.categories)}
+
+        self.pools: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for category in self.categories:
+            ranges = [(start, end) for (group_category, year, round_type), (start, end) in index.groups.items()
+                      if group_category == category and self.selects(year, round_type)]
+            positions = np.concatenate([np.arange(start, end) for start, end in ranges]) if ranges \
+                else np.zeros(0, dtype=np.int64)
+            ranks = index.ranks[positions].astype(np.int64)
+            # Groups are sorted on their own; pooling several needs one merge
+            order = np.argsort(ranks, kind='stable') if len(ranges) > 1 else np.arange(len(ranks))
+            self.pools[category] = (positions[order], ranks[order])
+        self._options = None
+
+    def selects(self, year: str, round_type: str) -> bool:
+        """Whether a (year, round) group is part of the selection"""
+        return (self.year is None or year == self.year) and (self.round_type is None or round_type == self.round_type)
+
+    def top_k(self, ranks: Iterable[int], categories: Iterable[str], k: int = 5,
+              margin: float = DEFAULT_MARGIN) -> Dict[str, np.ndarray]:
+        """Index positions of up to k options per band and student, plus per-band option counts
+
+        Returns {band: (students, k) positions, -1 padded} and
+        {band + '_count' / 'eligible_count': (students,) counts}.
+        """
+        ranks = np.asarray(ranks, dtype=np.float64)
+        categories = np.asarray(categories, dtype=object)
+        result = {band: np.full((len(ranks), k), -1, dtype=np.int64) for band in BANDS}
+        for name in ['eligible'] + BANDS:
+            result[f'{name}_count'] = np.zeros(len(ranks), dtype=np.int64)
+
+        for category, (positions, pool_ranks) in self.pools.items():
+            rows = np.flatnonzero(categories == category)
+            if not len(rows) or not len(positions):
+                continue
+            student_ranks = ranks[rows]
+            eligible = np.searchsorted(pool_ranks, student_ranks, side='left')
+            safe = np.searchsorted(pool_ranks, student_ranks * (1 + margin), side='left')
+            reach = np.searchsorted(pool_ranks, student_ranks * (1 - margin), side='left')
+            end = np.full(len(rows), len(positions))
+
+            result['safe'][rows] = take_band(positions, safe, end, k, from_end=False)
+            result['target'][rows] = take_band(positions, eligible, safe, k, from_end=False)
+            result['reach'][rows] = take_band(positions, reach, eligible, k, from_end=True)
+            result['eligible_count'][rows] = end - eligible
+            result['safe_count'][rows] = end - safe
+            result['target_count'][rows] = safe - eligible
+            result['reach_count'][rows] = eligible - reach
+        return result
+
+    def options(self) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """Distinct options of the selection and their highest cutoff per category (-1 if none)
+
+        The cutoff table has one row per category in self.categories plus a
+        last all -1 row for unknown categories, and one column per option.
+        """
+        if self._options is None:
+            columns = self.index.columns
+            pools = [positions for positions, _ in self.pools.values()]
+            if not sum(map(len, pools)):
+                # An empty dataset (or selection) has no options at all
+                self._options = ([], np.full((len(self.categories) + 1, 0), -1, dtype=np.int32))
+                return self._options
+            positions = np.concatenate(pools)
+            category_of = np.concatenate([np.full(len(pool), i) for i, pool in enumerate(pools)])
+            keys = np.stack([columns.codes(field)[positions].astype(np.int64) for field in OPTION_FIELDS], axis=1)
+            unique_keys, option_of = np.unique(keys.reshape(-1, len(OPTION_FIELDS)), axis=0, return_inverse=True)
+
+            cutoffs = np.full((len(self.categories) + 1, len(unique_keys)), -1, dtype=np.int32)
+            np.maximum.at(cutoffs, (category_of, option_of.ravel()), self.index.ranks[positions])
+
+            options = []
+            for key in unique_keys.tolist():
+                option = {field: columns.lookup[field][code] for field, code in zip(OPTION_FIELDS, key)}
+                option['institute'] = columns.institute_names[key[0]]
+                options.append(option)
+            self._options = (options, cutoffs)
+        return self._options
+
+    def eligibility(self, ranks: Iterable[int], categories: Iterable[str],
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+        """(students, options) boolean matrix of the options each student is eligible for"""
+        _, cutoffs = self.options()
+        ranks = np.asarray(ranks, dtype=np.int64)
+        unknown = len(self.categories)
+        category_idx = np.array([self.category_codes.get(category, unknown) for category in categories], dtype=np.int64)
+        matrix = np.empty((len(ranks), cutoffs.shape[1]), dtype=bool)
+        # Row blocks bound the size of the gathered cutoff temporaries
+        for start in range(0, len(ranks), chunk_size):
+            block = slice(start, start + chunk_size)
+            np.greater_equal(cutoffs[category_idx[block]], ranks[block, None], out=matrix[block])
+        return matrix
+
+# Per-process predictor of the chunked runner
+_worker_predictor: Optional[BatchPredictor] = None
+
+def _init_worker(data_dir: str, year: Optional[str], round_type: Optional[str]):
+    global _worker_predictor
+    _worker_predictor = BatchPredictor(load_rank_index(data_dir, rebuild=False), year, round_type)
+
+def _run_chunk(task: Tuple[str, np.ndarray, np.ndarray, Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    method, ranks, categories, kwargs = task
+    if method == 'eligibility':
+        return {'eligible': _worker_predictor.eligibility(ranks, categories, **kwargs)}
+    return _worker_predictor.top_k(ranks, categories, **kwargs)
+
+def predict_chunked(data_dir: Union[str, Path], method: str, ranks: np.ndarray, categories: np.ndarray,
+                    year: Optional[str] = None, round_type: Optional[str] = None, jobs: int = 1,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, **kwargs) -> Dict[str, np.ndarray]:
+    """Run 'top_k' or 'eligibility' over chunks of students, across worker processes if jobs > 1
+
+    Every worker memory-maps the same rank index, so only student chunks and
+    result arrays cross process boundaries. Results are concatenated in
+    student order.
+    """
+    ranks = np.asarray(ranks)
+    categories = np.asarray(categories, dtype=object)
+    tasks = [(method, ranks[start:start + chunk_size], categories[start:start + chunk_size], kwargs)
+             for start in range(0, len(ranks), chunk_size)]
+    if jobs <= 1 or len(tasks) <= 1:
+        _init_worker(str(data_dir), year, round_type)
+        results = [_run_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(str(data_dir), year, round_type)) as pool:
+            results = list(pool.map(_run_chunk, tasks))
+    if not results:
+        return {}
+    return {key: np.concatenate([result[key] for result in results]) for key in results[0]}
+
+def read_students(path: Path) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Ids, ranks and categories from a CSV with rank and category columns (id optional)"""
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    ids = [row.get('id') or str(n) for n, row in enumerate(rows, 1)]
+    ranks = np.array([int(float(row['rank'])) for row in rows], dtype=np.int64)
+    categories = np.array([row['category'].strip().upper() for row in rows], dtype=object)
+    return ids, ranks, categories
+
+def main(argv: Optional[List[str]] = None):
+    """Predict options for a CSV of students"""
+    parser = argparse.ArgumentParser(description='Batch KCET option prediction for many students')
+    parser.add_argument('--data-dir', type=Path, default=Path('public/data'), help='Extractor output directory')
+    parser.add_argument('--students', type=Path, required=True, help='CSV with rank, category and optional id columns')
+    parser.add_argument('--year', default=None, help='Only use cutoffs of this year (default: all)')
+    parser.add_argument('--round', dest='round_type', default=None, help='Only use cutoffs of this round (default: all)')
+    parser.add_argument('--top-k', type=int, default=5, help='Options per band and student (default: 5)')
+    parser.add_argument('--margin', type=float, default=DEFAULT_MARGIN,
+                        help='Relative rank margin separating safe, target and reach (default: 0.1)')
+    parser.add_argument('--matrix', type=Path, default=None,
+                        help='Write the student x option eligibility matrix to this .npz instead of top-k lists')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='Worker processes (0 = one per CPU, default: 1)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'Students per chunk (default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--out', type=Path, default=None, help='NDJSON output file (default: stdout)')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+
+    ids, ranks, categories = read_students(args.students)
+    # Rebuild a stale index once here rather than in every worker
+    predictor = BatchPredictor(load_rank_index(args.data_dir), args.year, args.round_type)
+
+    if args.matrix is not None:
+        result = predict_chunked(args.data_dir, 'eligibility', ranks, categories, args.year, args.round_type,
+                                 jobs, args.chunk_size)
+        options, _ = predictor.options()
+        np.savez_compressed(
+            args.matrix,
+            eligible=result.get('eligible', np.zeros((0, len(options)), dtype=bool)),
+            students=np.array(ids),
+            **{f'option_{field}': np.array([option[field] for option in options])
+               for field in ['institute', *OPTION_FIELDS]}
+        )
+        logger.info(f"Wrote {len(ids)} x {len(options)} eligibility matrix to {args.matrix}")
+        return
+
+    result = predict_chunked(args.data_dir, 'top_k', ranks, categories, args.year, args.round_type,
+                             jobs, args.chunk_size, k=args.top_k, margin=args.margin)
+    out = open(args.out, 'w', encoding='utf-8') if args.out is not None else sys.stdout
+    try:
+        for n, student_id in enumerate(ids):
+            line = {
+                'id': student_id,
+                'rank': int(ranks[n]),
+                'category': categories[n],
+                'counts': {name: int(result[f'{name}_count'][n]) for name in ['eligible'] + BANDS}
+            }
+            for band in BANDS:
+                line[band] = [predictor.index.record(i) for i in result[band][n].tolist() if i >= 0]
+            out.write(json.dumps(line, ensure_ascii=False, separators=(',', ':')))
+            out.write('\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == "__main__":
+    main()
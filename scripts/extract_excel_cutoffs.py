@@ -2,21 +2,50 @@
 """
 KCET Excel Cutoff Extractor
 Extracts cutoff data from KCET Excel files (2023, 2024, 2025) with proper handling of different formats
+
+Usage:
+  python scripts/extract_excel_cutoffs.py extract --input-dir . --out-dir public/data
+  python scripts/extract_excel_cutoffs.py extract kcet-2025-round2-cutoffs.xlsx  # upsert one file
+  python scripts/extract_excel_cutoffs.py stats --data-dir public/data
+  python scripts/extract_excel_cutoffs.py query --rank 12000 --category GM --year 2025 --round R1
+  python scripts/extract_excel_cutoffs.py validate --data-dir public/data --strict
+
+Without a command the arguments are those of extract.
 """
 
-import pandas as pd
+import argparse
+import cProfile
+import gzip
+import hashlib
 import json
 import os
 import re
+import statistics
+import sys
+import time
+import tracemalloc
+from array import array
+from bisect import bisect_right
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Any, NamedTuple, Optional, Tuple, Iterable, Iterator, Set
+
 import logging
 from datetime import datetime
+from functools import lru_cache
+
+# numpy, pandas, openpyxl and the index modules are imported where they are used,
+# so the stats, query and validate commands start without loading them
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Bump whenever parsing logic changes so cached extractions are invalidated
+EXTRACTOR_VERSION = '3'
+
 # Comprehensive college mapping with accurate details
 COLLEGE_MAPPING = {
     'E001': 'University of Visvesvaraya College of Engineering Bangalore ( PUBLIC UNIV. )',
@@ -177,136 +206,316 @@ CATEGORY_MAPPING = {
     'STG': 'STG', 'STK': 'STK', 'STR': 'STR'
 }
 
-def extract_college_info(df: pd.DataFrame, filename: str) -> Tuple[Optional[str], Optional[str]]:
-    """Extract college code and name from the dataframe"""
-    college_code = None
-    college_name = None
-    
-    # Look for college information in the first few rows
-    for i in range(min(10, len(df))):
-        row = df.iloc[i]
-        for col in df.columns:
-            cell_value = str(row[col]).strip()
-            if pd.isna(cell_value) or cell_value == 'nan':
-                continue
-                
-            # Pattern for college code and name
-            college_match = re.search(r'College:\s*(E\d{3})\s*(.+?)(?:\s*\(|$)', cell_value, re.IGNORECASE)
-            if college_match:
-                college_code = college_match.group(1)
-                college_name = college_match.group(2).strip()
-                logger.info(f"Found college: {college_code} - {college_name}")
-                return college_code, college_name
-    
-    # If not found in first 10 rows, search entire dataframe
-    for i in range(len(df)):
-        row = df.iloc[i]
-        for col in df.columns:
-            cell_value = str(row[col]).strip()
-            if pd.isna(cell_value) or cell_value == 'nan':
+# Why a row or cell was dropped during parsing, as counted in run metrics;
+# unattributed rows come before a sheet's first college banner (or on a sheet
+# without any), no_header rows belong to a block with no header row to read
+DROP_REASONS = ['unknown_course', 'out_of_range', 'non_numeric', 'misaligned_row', 'unattributed', 'no_header']
+
+class CutoffRecord(NamedTuple):
+    """One extracted cutoff
+    
+    Fields read by name as record.year or record['year']; _asdict() gives the
+    output form at serialization time. Records that are held rather than
+    passed along are kept in a RecordBatch.
+    """
+    institute: str
+    institute_code: str
+    course: str
+    category: str
+    cutoff_rank: int
+    year: str
+    round: str
+    
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+class StringTable(dict):
+    """Codes of the strings seen so far; an unseen string gets the next code"""
+    
+    def __init__(self):
+        super().__init__()
+        self.strings: List[str] = []
+    
+    def __missing__(self, value: str) -> int:
+        code = self[value] = len(self.strings)
+        self.strings.append(value)
+        return code
+
+class RecordBatch:
+    """Records held as parallel typed arrays, string fields coded against one shared table
+    
+    A record costs 28 bytes instead of a dict and its strings, and the whole
+    batch is a handful of objects for the garbage collector and pickle.
+    Iterating yields CutoffRecord tuples.
+    """
+    
+    RANK_COLUMN = CutoffRecord._fields.index('cutoff_rank')
+    # Records of an iterable are coded this many at a time, so only one chunk is ever materialized
+    CHUNK_SIZE = 4096
+    
+    def __init__(self, records: Iterable[CutoffRecord] = ()):
+        self.table = StringTable()
+        self.columns = [array('i' if i == self.RANK_COLUMN else 'I') for i in range(len(CutoffRecord._fields))]
+        self.extend(records)
+    
+    def __len__(self) -> int:
+        return len(self.columns[self.RANK_COLUMN])
+    
+    def extend(self, records: Iterable[CutoffRecord]):
+        """Append records (or any tuples in CutoffRecord field order)"""
+        code = self.table.__getitem__
+        if isinstance(records, RecordBatch):
+            # Recode the other batch's table once and copy its columns over
+            recode = list(map(code, records.table.strings))
+            for i, column in enumerate(records.columns):
+                self.columns[i].extend(column if i == self.RANK_COLUMN else map(recode.__getitem__, column))
+            return
+        records = iter(records)
+        while True:
+            chunk = list(islice(records, self.CHUNK_SIZE))
+            if not chunk:
+                break
+            for i, values in enumerate(zip(*chunk)):
+                self.columns[i].extend(values if i == self.RANK_COLUMN else map(code, values))
+    
+    def __iter__(self) -> Iterator[CutoffRecord]:
+        s = self.table.strings
+        for institute, institute_code, course, category, rank, year, round_type in zip(*self.columns):
+            yield CutoffRecord(s[institute], s[institute_code], s[course], s[category], rank, s[year], s[round_type])
+    
+    def groups(self) -> Set[Tuple[str, str]]:
+        """The (year, round) groups the records fall into, read off the coded columns"""
+        s = self.table.strings
+        codes = set(zip(self.columns[CutoffRecord._fields.index('year')], self.columns[CutoffRecord._fields.index('round')]))
+        return {(s[year], s[round_type]) for year, round_type in codes}
+
+# Input engines: Excel workbooks in the project root, or the PDF text dumps
+TEXT_SUFFIX = '.pdf.txt'
+SOURCE_PATTERNS = {'excel': '*.xlsx', 'text': 'public/data/raw/*' + TEXT_SUFFIX}
+
+# Precompiled sheet locators
+# The name is whatever follows the code on the banner's first line, up to any '(';
+# banners whose address wraps onto a second line must still match on their code
+COLLEGE_PATTERN = re.compile(r'College:\s*(E\d{3})\b[ \t]*([^(\n]*)', re.IGNORECASE)
+HEADER_LABELS = frozenset(['course name', 'course', 'branch', 'branch name'])
+
+def segment_sheet(df: 'pd.DataFrame') -> List[Tuple[str, str, Optional[int], int, int]]:
+    """Split a sheet into per-college blocks in a single sweep over its cells
+    
+    Returns (college code, college name, header row index, start, end) per college
+    banner, where [start, end) are the block's data rows. A block without its own
+    header row reuses the closest header above it.
+    """
+    banners = []
+    header_rows = []
+    for i, row in enumerate(df.itertuples(index=False, name=None)):
+        if str(row[0]).strip().lower() in HEADER_LABELS:
+            header_rows.append(i)
+            continue
+        for value in row:
+            if not isinstance(value, str):
                 continue
-                
-            college_match = re.search(r'College:\s*(E\d{3})\s*(.+?)(?:\s*\(|$)', cell_value, re.IGNORECASE)
+            college_match = COLLEGE_PATTERN.search(value.strip())
             if college_match:
                 college_code = college_match.group(1)
                 college_name = college_match.group(2).strip()
-                logger.info(f"Found college: {college_code} - {college_name}")
-                return college_code, college_name
-    
-    logger.warning(f"Could not extract college info from {filename}")
-    return None, None
-
-def find_header_row(df: pd.DataFrame) -> Optional[int]:
-    """Find the header row containing category information"""
-    for i in range(len(df)):
-        row = df.iloc[i]
-        first_cell = str(row.iloc[0]).strip()
-        if first_cell.lower() in ['course name', 'course', 'branch', 'branch name']:
-            logger.info(f"Found header row at index {i}")
-            return i
-    return None
+                logger.debug(f"Found college: {college_code} - {college_name}")
+                banners.append((i, college_code, college_name))
+                break
+    
+    # Rows before the first banner belong to a college whose banner is not on
+    # this sheet, so they cannot be attributed and are left out
+    blocks = []
+    next_header = 0
+    last_header = None
+    for n, (banner_idx, college_code, college_name) in enumerate(banners):
+        end = banners[n + 1][0] if n + 1 < len(banners) else len(df)
+        while next_header < len(header_rows) and header_rows[next_header] < banner_idx:
+            last_header = header_rows[next_header]
+            next_header += 1
+        if next_header < len(header_rows) and header_rows[next_header] < end:
+            header_idx = header_rows[next_header]
+            start = header_idx + 1
+        else:
+            header_idx = last_header
+            start = banner_idx + 1
+        blocks.append((college_code, college_name, header_idx, start, end))
+    return blocks
 
-def map_branch(course_name: str) -> Optional[str]:
-    """Map course name to branch code"""
-    course_upper = course_name.upper().strip()
-    
-    # Direct match
-    if course_upper in BRANCH_MAPPING:
-        return BRANCH_MAPPING[course_upper]
-    
-    # Partial matching
-    for key, value in BRANCH_MAPPING.items():
-        if key in course_upper or course_upper in key:
-            return value
-    
-    # Handle common variations
-    variations = {
-        'CSE': 'CS',
-        'COMPUTER SCIENCE': 'CS',
-        'COMPUTER': 'CS',
-        'ECE': 'EC',
-        'ELECTRONICS': 'EC',
-        'MECH': 'ME',
-        'MECHANICAL': 'ME',
-        'CIVIL': 'CE',
-        'IT': 'IE',
-        'INFORMATION TECHNOLOGY': 'IE',
-        'INFORMATION SCIENCE': 'IE',
-        'ELECTRICAL': 'EE',
-        'BIO': 'BT',
-        'BIOTECH': 'BT',
-        'CHEMICAL': 'CH',
-        'TELECOM': 'TC',
-        'INSTRUMENTATION': 'IT',
-        'MEDICAL': 'MD',
-        'AI': 'AI',
-        'ARTIFICIAL INTELLIGENCE': 'AI',
-        'MACHINE LEARNING': 'AI',
-        'ROBOTICS': 'RA',
-        'AUTOMATION': 'RA',
-        'AEROSPACE': 'SE',
-        'BUSINESS SYSTEMS': 'CB',
-        'CYBER': 'CY',
-        'DATA SCIENCE': 'DS',
-        'DATA': 'DS'
-    }
+# Common course-name variations, checked after BRANCH_MAPPING in this order
+BRANCH_VARIATIONS = {
+    'CSE': 'CS',
+    'COMPUTER SCIENCE': 'CS',
+    'COMPUTER': 'CS',
+    'ECE': 'EC',
+    'ELECTRONICS': 'EC',
+    'MECH': 'ME',
+    'MECHANICAL': 'ME',
+    'CIVIL': 'CE',
+    'IT': 'IE',
+    'INFORMATION TECHNOLOGY': 'IE',
+    'INFORMATION SCIENCE': 'IE',
+    'ELECTRICAL': 'EE',
+    'BIO': 'BT',
+    'BIOTECH': 'BT',
+    'CHEMICAL': 'CH',
+    'TELECOM': 'TC',
+    'INSTRUMENTATION': 'IT',
+    'MEDICAL': 'MD',
+    'AI': 'AI',
+    'ARTIFICIAL INTELLIGENCE': 'AI',
+    'MACHINE LEARNING': 'AI',
+    'ROBOTICS': 'RA',
+    'AUTOMATION': 'RA',
+    'AEROSPACE': 'SE',
+    'BUSINESS SYSTEMS': 'CB',
+    'CYBER': 'CY',
+    'DATA SCIENCE': 'DS',
+    'DATA': 'DS'
+}
+
+class BranchMatcher:
+    """Course-name to branch-code matcher compiled once from the mapping tables
     
-    for variation, code in variations.items():
-        if variation in course_upper:
-            return code
+    Rules are applied in the same precedence as a linear scan: exact match, then
+    the first mapping key that contains or is contained in the course name, then
+    the first variation contained in it. Results are cached per normalized name.
+    """
     
-    logger.warning(f"Unknown course: {course_name}")
-    return None
+    def __init__(self, mapping: Dict[str, str], variations: Dict[str, str], cache_size: int = 4096):
+        self.exact = dict(mapping)
+        self.keys = list(mapping)
+        self.codes = [mapping[key] for key in self.keys]
+        self.key_rank = {key: i for i, key in enumerate(self.keys)}
+        self.variation_codes = list(variations.values())
+        self.variation_rank = {variation: i for i, variation in enumerate(variations)}
+        
+        # Zero-width lookahead alternations report, at every offset, the first
+        # pattern (in precedence order) starting there
+        self.key_pattern = re.compile('(?=(' + '|'.join(map(re.escape, self.keys)) + '))')
+        self.variation_pattern = re.compile('(?=(' + '|'.join(map(re.escape, variations)) + '))')
+        
+        # All keys joined by a separator, so the first key containing a name is a single find()
+        self.joined_keys = '\0'.join(self.keys)
+        self.key_offsets = []
+        offset = 0
+        for key in self.keys:
+            self.key_offsets.append(offset)
+            offset += len(key) + 1
+        
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+        self.reported: Set[str] = set()
+    
+    def match(self, course_name: str, warn: bool = True) -> Optional[str]:
+        """Map a course name to its branch code, warning once per unknown name unless warn is off"""
+        course_upper = course_name.upper().strip()
+        code = self.lookup(course_upper)
+        if code is None and warn and course_upper not in self.reported:
+            self.reported.add(course_upper)
+            logger.warning(f"Unknown course: {course_upper}")
+        return code
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Cache hit/miss counters"""
+        info = self.lookup.cache_info()
+        return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
+    
+    def _lookup(self, course_upper: str) -> Optional[str]:
+        # Direct match
+        if course_upper in self.exact:
+            return self.exact[course_upper]
+        
+        # Partial matching: earliest key that is a substring of the name ...
+        best = len(self.keys)
+        for found in self.key_pattern.finditer(course_upper):
+            best = min(best, self.key_rank[found.group(1)])
+        # ... or that the name is a substring of
+        if '\0' in course_upper:
+            best = min([best] + [i for i, key in enumerate(self.keys) if course_upper in key])
+        else:
+            pos = self.joined_keys.find(course_upper)
+            if pos >= 0:
+                best = min(best, bisect_right(self.key_offsets, pos) - 1)
+        if best < len(self.keys):
+            return self.codes[best]
+        
+        # Handle common variations
+        ranks = [self.variation_rank[found.group(1)] for found in self.variation_pattern.finditer(course_upper)]
+        if ranks:
+            return self.variation_codes[min(ranks)]
+        
+        return None
+
+@lru_cache(maxsize=None)
+def branch_matcher() -> BranchMatcher:
+    """The shared matcher for workbook course names, compiled on first use"""
+    return BranchMatcher(BRANCH_MAPPING, BRANCH_VARIATIONS)
+
+def map_branch(course_name: str) -> Optional[str]:
+    """Map course name to branch code"""
+    return branch_matcher().match(course_name)
 
 def determine_round(filename: str) -> str:
     """Determine round from filename"""
     filename_lower = filename.lower()
-    if 'round1' in filename_lower:
+    # Mock allotments are named after the round they rehearse (mock-round1)
+    if 'mock' in filename_lower:
+        return 'MOCK'
+    elif 'round1' in filename_lower:
         return 'R1'
     elif 'round2' in filename_lower:
         return 'R2'
     elif 'round3' in filename_lower or 'extended' in filename_lower:
         return 'EXT'
-    elif 'mock' in filename_lower:
-        return 'MOCK'
     else:
         return 'R1'
 
-def parse_excel_file(df: pd.DataFrame, year: str, source: str) -> List[Dict[str, Any]]:
-    """Parse Excel file and extract cutoff data"""
+def parse_excel_file(df: 'pd.DataFrame', year: str, source: str,
+                     drops: Optional[Dict[str, int]] = None) -> List[CutoffRecord]:
+    """Parse Excel file and extract cutoff data for every college on the sheet
+    
+    If given, drops accumulates per-reason counts of dropped rows and cells.
+    """
     results = []
     
-    # Extract college info
-    college_code, college_name = extract_college_info(df, source)
-    if not college_code:
+    # Locate every college block on the sheet
+    blocks = segment_sheet(df)
+    if drops is not None:
+        drops['unattributed'] += count_course_rows(df, 0, blocks[0][3] if blocks else len(df))
+    if not blocks:
+        logger.warning(f"Could not extract college info from {source}")
         return results
     
-    # Find header row
-    header_row_idx = find_header_row(df)
-    if header_row_idx is None:
-        logger.warning(f"Could not find header row in {source}")
-        return results
+    # Determine round from filename
+    round_type = determine_round(source)
     
+    for college_code, college_name, header_row_idx, start, end in blocks:
+        if header_row_idx is None:
+            logger.warning(f"Could not find header row for {college_code} in {source}")
+            if drops is not None:
+                drops['no_header'] += count_course_rows(df, start, end)
+            continue
+        results.extend(parse_college_block(df, header_row_idx, start, end, college_code, year, round_type, drops))
+    
+    return results
+
+def count_course_rows(df: 'pd.DataFrame', start: int, end: int) -> int:
+    """Number of rows in [start, end) whose first cell names a known course"""
+    course_names = df.iloc[start:end, 0].map(str).str.strip()
+    # Titles and addresses are not courses, so they are not worth a warning
+    branch_codes = {name: branch_matcher().match(name, warn=False) for name in course_names.unique()}
+    return int(course_names.map(branch_codes).map(bool).sum())
+
+def parse_college_block(df: 'pd.DataFrame', header_row_idx: int, start: int, end: int,
+                        college_code: str, year: str, round_type: str,
+                        drops: Optional[Dict[str, int]] = None) -> List[CutoffRecord]:
+    """Parse the data rows [start, end) of one college block"""
+    import numpy as np
+    import pandas as pd
+    
+    results = []
     header_row = df.iloc[header_row_idx]
     
     # Map category columns
@@ -318,147 +527,1502 @@ def parse_excel_file(df: pd.DataFrame, year: str, source: str) -> List[Dict[str,
         if category in CATEGORY_MAPPING:
             category_columns[i] = CATEGORY_MAPPING[category]
     
-    # Determine round from filename
-    round_type = determine_round(source)
+    if not category_columns:
+        return results
+    
+    # Course names of the data rows, stringified the same way as the header scan
+    data = df.iloc[start:end]
+    course_names = data.iloc[:, 0].map(str).str.strip()
+    skip = (course_names == 'nan') | course_names.str.lower().isin(['course name', 'course', '--', ''])
+    course_names = course_names[~skip]
+    
+    # Map branches once per distinct course name rather than once per row
+    branch_codes = {name: map_branch(name) for name in course_names.unique()}
+    branches = course_names.map(branch_codes)
+    branches = branches[branches.notna() & branches.astype(bool)]
+    if drops is not None:
+        drops['unknown_course'] += len(course_names) - len(branches)
+    if branches.empty:
+        return results
     
-    # Process data rows
-    for i in range(header_row_idx + 1, len(df)):
-        row = df.iloc[i]
-        course_name = str(row.iloc[0]).strip()
+    # Flatten the category block row-major so records keep the row-by-row column order
+    col_positions = list(category_columns)
+    cells = data.loc[branches.index].iloc[:, col_positions].to_numpy(dtype=object).ravel()
+    ranks = pd.to_numeric(pd.Series(cells), errors='coerce').to_numpy(dtype=float)
+    in_range = (ranks > 0) & (ranks < 200000)  # Reasonable range; NaN never matches
+    if drops is not None:
+        numeric = ~np.isnan(ranks)
+        drops['non_numeric'] += int(np.count_nonzero(~numeric & ~pd.isna(cells)))
+        drops['out_of_range'] += int(np.count_nonzero(numeric & ~in_range))
+    
+    row_idx, col_idx = np.divmod(np.flatnonzero(in_range), len(col_positions))
+    branch_values = branches.tolist()
+    categories = [category_columns[i] for i in col_positions]
+    institute = COLLEGE_MAPPING.get(college_code, f'College {college_code}')
+    
+    for r, c, closing_rank in zip(row_idx.tolist(), col_idx.tolist(), ranks[in_range].astype(np.int64).tolist()):
+        results.append(CutoffRecord(institute, college_code, branch_values[r], categories[c], closing_rank,
+                                    year, round_type))
+    
+    return results
+
+def iter_workbook_sheets(file_path: str, sheet_names: Optional[List[str]] = None) -> Iterator[Tuple[str, Iterator[tuple]]]:
+    """Open a workbook once and yield (sheet name, row generator) pairs in read-only mode"""
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for sheet_name in (sheet_names if sheet_names is not None else workbook.sheetnames):
+            sheet = workbook[sheet_name]
+            # Read-only sheets trust the stored dimensions, which are often wrong
+            sheet.reset_dimensions()
+            yield sheet_name, sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def sheet_to_dataframe(rows: Iterable[tuple]) -> 'pd.DataFrame':
+    """Build a sheet DataFrame from streamed rows, matching pd.read_excel(header=None)"""
+    import numpy as np
+    import pandas as pd
+    
+    data = []
+    width = 0
+    last_row = -1
+    for row in rows:
+        values = [np.nan if value is None or value == '' else value for value in row]
+        # Trim trailing empty cells like pandas does
+        while values and isinstance(values[-1], float) and np.isnan(values[-1]):
+            values.pop()
+        if values:
+            width = max(width, len(values))
+            last_row = len(data)
+        data.append(values)
+    # Drop trailing empty rows and pad the rest to a rectangle
+    del data[last_row + 1:]
+    for values in data:
+        values.extend([np.nan] * (width - len(values)))
+    return pd.DataFrame(data)
+
+def list_sheet_names(file_path: str) -> List[str]:
+    """List the sheet names of an Excel file"""
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+def extract_workbook(file_path: str, sheet_names: Optional[List[str]] = None,
+                     metrics: Optional[Dict[str, Any]] = None) -> RecordBatch:
+    """Extract cutoff data from Excel file, optionally restricted to the given sheets; errors propagate
+    
+    If given, metrics['sheets'] receives timing, row and drop counts per sheet,
+    plus the tracemalloc peak when memory tracing is on.
+    """
+    logger.info(f"Processing: {os.path.basename(file_path)}")
+    
+    all_results = RecordBatch()
+    tracing = tracemalloc.is_tracing()
+    
+    # Detect year from filename
+    year_match = re.search(r'20\d{2}', os.path.basename(file_path))
+    year = year_match.group(0) if year_match else str(datetime.now().year)
+    
+    # Stream the workbook one sheet at a time; only the current sheet is held in memory
+    for sheet_name, rows in iter_workbook_sheets(file_path, sheet_names):
+        logger.debug(f"Processing sheet: {sheet_name}")
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        if tracing:
+            tracemalloc.reset_peak()
+        drops = {reason: 0 for reason in DROP_REASONS}
         
-        if pd.isna(course_name) or course_name == 'nan' or course_name.lower() in ['course name', 'course', '--', '']:
-            continue
+        df = sheet_to_dataframe(rows)
         
-        # Map branch
-        branch_code = map_branch(course_name)
-        if not branch_code:
-            continue
+        # Parse the sheet
+        results = [] if df.empty else parse_excel_file(df, year, os.path.basename(file_path), drops)
+        all_results.extend(results)
         
-        # Extract closing ranks for each category
-        for col_idx, category in category_columns.items():
-            cell_value = row.iloc[col_idx]
-            
-            # Handle different data types
-            if pd.isna(cell_value):
+        if metrics is not None:
+            metrics['sheets'].append({
+                'sheet': sheet_name,
+                'wall_seconds': time.perf_counter() - wall_start,
+                'cpu_seconds': time.process_time() - cpu_start,
+                'peak_bytes': tracemalloc.get_traced_memory()[1] if tracing else None,
+                'rows_scanned': len(df),
+                'records': len(results),
+                'dropped': drops
+            })
+    
+    logger.info(f"Extracted {len(all_results)} records from {os.path.basename(file_path)}")
+    return all_results
+
+def extract_from_excel(file_path: str, sheet_names: Optional[List[str]] = None) -> RecordBatch:
+    """Extract cutoff data from Excel file, optionally restricted to the given sheets"""
+    try:
+        return extract_workbook(file_path, sheet_names)
+    except Exception as e:
+        logger.error(f"Error processing {file_path}: {str(e)}")
+        return RecordBatch()
+
+# (workbook or text dump path, sheet names or None for all, cProfile output directory or None)
+Task = Tuple[str, Optional[List[str]], Optional[str]]
+
+# Line patterns of the PDF text dumps (public/data/raw/*.pdf.txt), one value per line
+TEXT_COLLEGE_PATTERN = re.compile(r'^College:\s*\(?(E\d{3})\b')
+TEXT_VALUE_PATTERN = re.compile(r'^(?:--|\d+(?:\.\d+)?)$')
+TEXT_FOOTER_PATTERN = re.compile(r'^(?:Generated on:|Page \d+ of\b)')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# Cells are eight characters wide; longer fractions (x.875) continue on the next line
+TEXT_WRAPPED_PATTERN = re.compile(r'^(?=.{8}$)\d+\.\d+$')
+TEXT_WRAP_TAIL_PATTERN = re.compile(r'^\d{1,3}$')
+
+def squeeze(text: str) -> str:
+    """Remove all whitespace; the PDF text layer drops or keeps word gaps unpredictably"""
+    return WHITESPACE_PATTERN.sub('', text)
+
+# Course names in the text dumps are matched with whitespace removed on both sides
+@lru_cache(maxsize=None)
+def text_branch_matcher() -> BranchMatcher:
+    """The matcher for text-dump course names, compiled on first use"""
+    return BranchMatcher({squeeze(key): code for key, code in BRANCH_MAPPING.items()},
+                         {squeeze(key): code for key, code in BRANCH_VARIATIONS.items()})
+
+def join_wrapped_values(values: List[str], expected: int) -> List[str]:
+    """Rejoin values whose trailing digits wrapped onto the next line, e.g. '34096.87' + '5'"""
+    excess = len(values) - expected
+    joined = []
+    for value in values:
+        if excess > 0 and joined and TEXT_WRAPPED_PATTERN.match(joined[-1]) and TEXT_WRAP_TAIL_PATTERN.match(value):
+            joined[-1] += value
+            excess -= 1
+        else:
+            joined.append(value)
+    return joined
+
+def iter_text_records(lines: Iterable[str], year: str, round_type: str,
+                      drops: Optional[Dict[str, int]] = None) -> Iterator[CutoffRecord]:
+    """Parse the text layer of a cutoff PDF line by line, yielding records as parse_excel_file builds them
+    
+    Each college banner is followed by its category codes, then by course
+    names each followed by one value per category. Lines before the first
+    banner are page headers and are ignored.
+    """
+    college_code = None
+    institute = None
+    categories: List[str] = []
+    reading_categories = False
+    course_name = None
+    values: List[str] = []
+    
+    def flush_row() -> Iterator[CutoffRecord]:
+        if course_name is None:
+            return
+        course = text_branch_matcher().match(squeeze(course_name))
+        row = join_wrapped_values(values, len(categories))
+        if not course or len(row) != len(categories):
+            if drops is not None:
+                drops['unknown_course' if not course else 'misaligned_row'] += 1
+            return
+        for category, value in zip(categories, row):
+            if value == '--':
+                if drops is not None:
+                    drops['non_numeric'] += 1
                 continue
-                
-            try:
-                closing_rank = float(cell_value)
-                if closing_rank > 0 and closing_rank < 200000:  # Reasonable range
-                    results.append({
-                        'institute': COLLEGE_MAPPING.get(college_code, f'College {college_code}'),
-                        'institute_code': college_code,
-                        'course': branch_code,
-                        'category': category,
-                        'cutoff_rank': int(closing_rank),
-                        'year': year,
-                        'round': round_type
-                    })
-            except (ValueError, TypeError):
+            closing_rank = float(value)
+            if not 0 < closing_rank < 200000:  # Reasonable range
+                if drops is not None:
+                    drops['out_of_range'] += 1
                 continue
+            yield CutoffRecord(institute, college_code, course, category, int(closing_rank), year, round_type)
+    
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        
+        if TEXT_VALUE_PATTERN.match(line):
+            # Values after a footer (the page count) belong to no row
+            if course_name is not None:
+                values.append(line)
+            continue
+        if reading_categories and line in CATEGORY_MAPPING:
+            categories.append(CATEGORY_MAPPING[line])
+            continue
+        reading_categories = False
+        
+        college_match = TEXT_COLLEGE_PATTERN.match(line)
+        is_name = college_match is None and not TEXT_FOOTER_PATTERN.match(line)
+        if is_name and course_name is not None and not values:
+            # A course name wrapped over several lines arrives before any of its values
+            course_name = f"{course_name} {line}"
+            continue
+        
+        # Any other line ends the current row
+        yield from flush_row()
+        course_name = None
+        values = []
+        if college_match:
+            college_code = college_match.group(1)
+            institute = COLLEGE_MAPPING.get(college_code, f'College {college_code}')
+            categories = []
+            reading_categories = True
+        elif is_name and college_code is not None:
+            course_name = line
+    
+    yield from flush_row()
+
+def extract_text_dump(file_path: str, metrics: Optional[Dict[str, Any]] = None) -> RecordBatch:
+    """Extract cutoff data from a PDF text dump without pandas; errors propagate"""
+    source = os.path.basename(file_path)
+    logger.info(f"Processing: {source}")
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    drops = {reason: 0 for reason in DROP_REASONS}
+    
+    year_match = re.search(r'20\d{2}', source)
+    year = year_match.group(0) if year_match else str(datetime.now().year)
+    
+    line_count = [0]
+    
+    def counted(lines: Iterable[str]) -> Iterator[str]:
+        for line_count[0], line in enumerate(lines, 1):
+            yield line
+    
+    with open(file_path, 'r', encoding='utf-8') as f:
+        results = RecordBatch(iter_text_records(counted(f), year, determine_round(source), drops))
     
+    if not results:
+        # The 2023/2024 dumps run each row's ranks together with no separator
+        logger.warning(f"No records in {source}; its text layout is not one value per line")
+    if metrics is not None:
+        metrics['sheets'].append({
+            'sheet': None,
+            'wall_seconds': time.perf_counter() - wall_start,
+            'cpu_seconds': time.process_time() - cpu_start,
+            'peak_bytes': tracemalloc.get_traced_memory()[1] if tracing else None,
+            'rows_scanned': line_count[0],
+            'records': len(results),
+            'dropped': drops
+        })
+    
+    logger.info(f"Extracted {len(results)} records from {source}")
     return results
 
-def extract_from_excel(file_path: str) -> List[Dict[str, Any]]:
-    """Extract cutoff data from Excel file"""
+def _extract_task(task: Task) -> Tuple[RecordBatch, Dict[str, Any]]:
+    """Process-pool entry point: extract one workbook or a slice of its sheets, with metrics"""
+    file_path, sheet_names, profile_dir = task
+    metrics: Dict[str, Any] = {'sheets': []}
+    profiler = None
+    if profile_dir is not None:
+        tracemalloc.start()
+        profiler = cProfile.Profile()
+        profiler.enable()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        if file_path.endswith(TEXT_SUFFIX):
+            records = extract_text_dump(file_path, metrics)
+        else:
+            records = extract_workbook(file_path, sheet_names, metrics)
+    finally:
+        metrics['wall_seconds'] = time.perf_counter() - wall_start
+        metrics['cpu_seconds'] = time.process_time() - cpu_start
+        if profiler is not None:
+            profiler.disable()
+            # Sheets reset the peak as they start, so the file's peak is the largest of theirs
+            peaks = [sheet['peak_bytes'] for sheet in metrics['sheets'] if sheet['peak_bytes'] is not None]
+            metrics['peak_bytes'] = max([tracemalloc.get_traced_memory()[1]] + peaks)
+            tracemalloc.stop()
+            suffix = f"--{sheet_names[0]}" if sheet_names else ''
+            profile_file = Path(profile_dir) / f"{Path(file_path).stem}{suffix}.prof".replace(os.sep, '_')
+            profile_file.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(profile_file))
+    metrics['branch_cache'] = branch_matcher().cache_stats()
+    return records, metrics
+
+def build_tasks(excel_files: List[Path], split_sheets: bool,
+                profile_dir: Optional[Path] = None) -> List[Tuple[int, Task]]:
+    """Build (file index, task) pairs in deterministic file/sheet order"""
+    tasks = []
+    profile = str(profile_dir) if profile_dir is not None else None
+    for file_idx, excel_file in enumerate(excel_files):
+        if not split_sheets or excel_file.name.endswith(TEXT_SUFFIX):
+            tasks.append((file_idx, (str(excel_file), None, profile)))
+            continue
+        try:
+            sheet_names = list_sheet_names(str(excel_file))
+        except Exception as e:
+            logger.error(f"Could not list sheets of {excel_file.name}: {str(e)}")
+            sheet_names = None
+        if not sheet_names:
+            # Let the worker report the problem for the whole file
+            tasks.append((file_idx, (str(excel_file), None, profile)))
+            continue
+        for sheet_name in sheet_names:
+            tasks.append((file_idx, (str(excel_file), [sheet_name], profile)))
+    return tasks
+
+def _run_task_safely(task: Task, isolated: bool = False) -> Optional[Tuple[RecordBatch, Dict[str, Any]]]:
+    """Run one task in-process (or alone in a fresh worker), returning None on failure"""
+    from concurrent.futures import ProcessPoolExecutor
+    
     try:
-        logger.info(f"Processing: {os.path.basename(file_path)}")
+        if not isolated:
+            return _extract_task(task)
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            return pool.submit(_extract_task, task).result()
+    except Exception as e:
+        logger.error(f"Failed to process {os.path.basename(task[0])}: {str(e)}")
+        return None
+
+def iter_task_results(tasks: List[Task], jobs: int) -> Iterator[Optional[Tuple[RecordBatch, Dict[str, Any]]]]:
+    """Run extraction tasks, yielding (records, metrics) in task order as each becomes available (None for a failed task)"""
+    if jobs <= 1:
+        for task in tasks:
+            yield _run_task_safely(task)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    
+    next_task = 0
+    while next_task < len(tasks):
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(_extract_task, task) for task in tasks[next_task:]]
+            for future in futures:
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    # A worker that dies takes the whole pool down with it, so re-run
+                    # this task alone to isolate the bad file and resume on a fresh pool
+                    yield _run_task_safely(tasks[next_task], isolated=True)
+                    next_task += 1
+                    break
+                except Exception as e:
+                    logger.error(f"Failed to process {os.path.basename(tasks[next_task][0])}: {str(e)}")
+                    result = None
+                yield result
+                next_task += 1
+
+def mapping_fingerprint() -> str:
+    """Hash of every lookup table that shapes the extracted records"""
+    tables = [COLLEGE_MAPPING, BRANCH_MAPPING, BRANCH_VARIATIONS, CATEGORY_MAPPING]
+    return hashlib.sha256(json.dumps(tables).encode('utf-8')).hexdigest()
+
+def file_digest(file_path: Path) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ExtractionCache:
+    """On-disk cache of extracted records per workbook
+    
+    Entries are keyed on the workbook's name and content hash, the extractor
+    version and the mapping tables, so edits to any of them invalidate the
+    entry. Records are stored as gzipped rows without the derived institute name.
+    """
+    
+    FIELDS = ['institute_code', 'course', 'category', 'cutoff_rank', 'year', 'round']  # Row order
+    
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+        self.manifest_file = cache_dir / 'manifest.json'
+        self.fingerprint = f"{EXTRACTOR_VERSION}:{mapping_fingerprint()}"
+        self.entries: Dict[str, Dict[str, Any]] = {}
+    
+    def key(self, excel_file: Path) -> str:
+        """Cache key for the current contents of a workbook"""
+        source = f"{excel_file.name}:{file_digest(excel_file)}:{self.fingerprint}"
+        return hashlib.sha256(source.encode('utf-8')).hexdigest()
+    
+    def get(self, excel_file: Path, key: str) -> Optional[RecordBatch]:
+        """Cached records for a workbook, or None on a miss"""
+        cache_file = self.cache_dir / f"{key}.json.gz"
+        if not cache_file.exists():
+            return None
+        try:
+            with gzip.open(cache_file, 'rt', encoding='utf-8') as f:
+                rows = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry for {excel_file.name}: {str(e)}")
+            return None
+        self.entries[excel_file.name] = {'key': key, 'records': len(rows)}
+        return RecordBatch(
+            (COLLEGE_MAPPING.get(code, f'College {code}'), code, course, category, rank, year, round_type)
+            for code, course, category, rank, year, round_type in rows
+        )
+    
+    def put(self, excel_file: Path, key: str, records: RecordBatch):
+        """Store the records extracted from a workbook"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        cache_file = self.cache_dir / f"{key}.json.gz"
+        tmp_file = cache_file.with_suffix('.tmp')
+        with gzip.open(tmp_file, 'wt', encoding='utf-8') as f:
+            json.dump([[record[field] for field in self.FIELDS] for record in records], f, separators=(',', ':'))
+        os.replace(tmp_file, cache_file)
+        self.entries[excel_file.name] = {'key': key, 'records': len(records)}
+    
+    def load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        """Entries of the saved manifest, if it was written by this extractor version and mapping"""
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('extractor_version') != EXTRACTOR_VERSION or manifest.get('mapping_hash') != mapping_fingerprint():
+            return {}
+        return manifest.get('files', {})
+    
+    def save(self):
+        """Write the manifest and drop entries no longer referenced by it
         
-        # Read Excel file
-        excel_file = pd.ExcelFile(file_path)
-        all_results = []
+        Entries of files that were not part of this run are kept; an entry is
+        only replaced, and its records dropped, when the same file name was
+        extracted with different contents.
+        """
+        if not self.cache_dir.exists():
+            return
+        files = {**self.load_manifest(), **self.entries}
+        manifest = {
+            'extractor_version': EXTRACTOR_VERSION,
+            'mapping_hash': mapping_fingerprint(),
+            'files': dict(sorted(files.items()))
+        }
+        tmp_file = self.manifest_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+        live = {entry['key'] for entry in files.values()}
+        for cache_file in self.cache_dir.glob('*.json.gz'):
+            if cache_file.name[:-len('.json.gz')] not in live:
+                cache_file.unlink()
+
+def iter_file_results(excel_files: List[Path], cache: Optional[ExtractionCache], jobs: int, split_sheets: bool,
+                      force: bool, profile_dir: Optional[Path] = None
+                      ) -> Iterator[Tuple[Path, Optional[RecordBatch], Dict[str, Any]]]:
+    """Yield (workbook, records, metrics) in file order, records None for a failed workbook
+    
+    Unchanged workbooks are served from the cache; the rest are extracted and
+    streamed out as soon as all of their tasks have finished.
+    """
+    cached: Dict[int, RecordBatch] = {}
+    cache_keys = {}
+    pending = []
+    for file_idx, excel_file in enumerate(excel_files):
+        if cache is not None:
+            cache_keys[file_idx] = cache.key(excel_file)
+            records = None if force else cache.get(excel_file, cache_keys[file_idx])
+            if records is not None:
+                logger.info(f"Using cached records for {excel_file.name} ({len(records)} records)")
+                cached[file_idx] = records
+                continue
+        pending.append(file_idx)
+    
+    tasks = build_tasks([excel_files[i] for i in pending], split_sheets, profile_dir)
+    task_results = iter_task_results([task for _, task in tasks], jobs)
+    task_files = iter([pending[pending_idx] for pending_idx, _ in tasks])
+    next_task_file = next(task_files, None)
+    
+    for file_idx, excel_file in enumerate(excel_files):
+        metrics: Dict[str, Any] = {'file': excel_file.name, 'cached': file_idx in cached, 'failed': False}
+        if file_idx in cached:
+            records = cached.pop(file_idx)
+            metrics['records'] = len(records)
+            yield excel_file, records, metrics
+            continue
         
-        # Detect year from filename
-        year_match = re.search(r'20\d{2}', os.path.basename(file_path))
-        year = year_match.group(0) if year_match else str(pd.Timestamp.now().year)
+        # Collect this file's tasks, which come next in task order
+        records: Optional[RecordBatch] = RecordBatch()
+        metrics.update({'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'peak_bytes': None, 'sheets': []})
+        while next_task_file == file_idx:
+            result = next(task_results)
+            if result is None:
+                records = None
+            else:
+                task_records, task_metrics = result
+                if records is not None:
+                    records.extend(task_records)
+                metrics['wall_seconds'] += task_metrics['wall_seconds']
+                metrics['cpu_seconds'] += task_metrics['cpu_seconds']
+                if task_metrics.get('peak_bytes') is not None:
+                    metrics['peak_bytes'] = max(metrics['peak_bytes'] or 0, task_metrics['peak_bytes'])
+                metrics['sheets'].extend(task_metrics['sheets'])
+                metrics['branch_cache'] = task_metrics['branch_cache']
+            next_task_file = next(task_files, None)
         
-        for sheet_name in excel_file.sheet_names:
-            logger.info(f"Processing sheet: {sheet_name}")
-            
-            # Read sheet
-            df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-            
-            if df.empty:
+        metrics['failed'] = records is None
+        metrics['records'] = len(records) if records is not None else 0
+        metrics['rows_scanned'] = sum(sheet['rows_scanned'] for sheet in metrics['sheets'])
+        metrics['dropped'] = {reason: sum(sheet['dropped'][reason] for sheet in metrics['sheets'])
+                              for reason in DROP_REASONS}
+        
+        if records is not None and cache is not None:
+            cache.put(excel_file, cache_keys[file_idx], records)
+        yield excel_file, records, metrics
+    
+    if cache is not None:
+        cache.save()
+
+def build_metrics_report(file_metrics: List[Dict[str, Any]], run: Dict[str, Any]) -> Dict[str, Any]:
+    """Assemble the machine-readable metrics report of an extraction run"""
+    extracted = [metrics for metrics in file_metrics if not metrics['cached'] and not metrics['failed']]
+    sheets = [dict(sheet, file=metrics['file']) for metrics in extracted for sheet in metrics['sheets']]
+    return {
+        'run': run,
+        'totals': {
+            'files': len(file_metrics),
+            'files_cached': sum(1 for metrics in file_metrics if metrics['cached']),
+            'files_failed': sum(1 for metrics in file_metrics if metrics['failed']),
+            'rows_scanned': sum(metrics['rows_scanned'] for metrics in extracted),
+            'records': sum(metrics['records'] for metrics in file_metrics),
+            'dropped': {reason: sum(metrics['dropped'][reason] for metrics in extracted) for reason in DROP_REASONS},
+            'extract_wall_seconds': sum(metrics['wall_seconds'] for metrics in extracted),
+            'extract_cpu_seconds': sum(metrics['cpu_seconds'] for metrics in extracted)
+        },
+        'slowest_sheets': [
+            {'file': sheet['file'], 'sheet': sheet['sheet'], 'wall_seconds': sheet['wall_seconds']}
+            for sheet in sorted(sheets, key=lambda sheet: sheet['wall_seconds'], reverse=True)[:10]
+        ],
+        'files': file_metrics
+    }
+
+# Records with the same key are the same cutoff; a later extraction replaces them
+UPSERT_KEY = ('institute_code', 'course', 'category', 'year', 'round')
+
+def record_key(record: CutoffRecord) -> Tuple[str, ...]:
+    """Upsert key of a record"""
+    return tuple(record[field] for field in UPSERT_KEY)
+
+# Conflict policies for records sharing an upsert key
+DEDUP_POLICIES = ['prefer-non-mock', 'min-rank', 'max-rank', 'prefer-latest']
+
+class Deduplicator:
+    """Keeps one record per upsert key, resolving collisions with a conflict policy in a single pass
+    
+    Every record costs one hash lookup and at most one comparison with the
+    current winner of its key. Winners keep the position where their key was
+    first seen.
+    
+    Policies: min-rank / max-rank keep the lowest / highest cutoff rank;
+    prefer-non-mock keeps records from non-mock files, then the lowest rank;
+    prefer-latest keeps the record from the most recently modified file, then
+    the last one read.
+    """
+    
+    def __init__(self, policy: str):
+        if policy not in DEDUP_POLICIES:
+            raise ValueError(f"Unknown dedup policy: {policy}")
+        self.policy = policy
+        # Records are held as plain tuples, which the garbage collector stops tracking
+        self.winners: Dict[Tuple[str, ...], Tuple[tuple, tuple, str]] = {}
+        self.losers: Dict[Tuple[str, ...], List[Tuple[int, str]]] = {}
+        self.records_in = 0
+    
+    def priority(self, rank: int, mock: bool, mtime: int, seq: int) -> tuple:
+        """Sort key of a candidate under the policy; the smallest wins"""
+        if self.policy == 'min-rank':
+            return (rank, seq)
+        if self.policy == 'max-rank':
+            return (-rank, seq)
+        if self.policy == 'prefer-non-mock':
+            return (mock, rank, seq)
+        return (-mtime, -seq)
+    
+    def add(self, records: Iterable[CutoffRecord], source: Path):
+        """Merge the records extracted from one input file"""
+        # Recognised by name, as determine_round does when it files them under MOCK
+        mock = 'mock' in source.name.lower()
+        try:
+            mtime = source.stat().st_mtime_ns
+        except OSError:
+            mtime = 0
+        for record in records:
+            self.records_in += 1
+            key = record_key(record)
+            candidate = (self.priority(record.cutoff_rank, mock, mtime, self.records_in), tuple(record), source.name)
+            current = self.winners.get(key)
+            if current is None:
+                self.winners[key] = candidate
                 continue
-            
-            # Parse the sheet
-            results = parse_excel_file(df, year, os.path.basename(file_path))
-            all_results.extend(results)
+            if candidate[0] < current[0]:
+                self.winners[key], candidate = candidate, current
+            self.losers.setdefault(key, []).append((candidate[1][RecordBatch.RANK_COLUMN], candidate[2]))
+    
+    def records(self) -> Iterator[CutoffRecord]:
+        """The winning record of every key"""
+        for _, record, _ in self.winners.values():
+            yield CutoffRecord._make(record)
+    
+    def report(self) -> Dict[str, Any]:
+        """Summary and per-key detail of every collision"""
+        kinds = {'same_file': 0, 'cross_file': 0, 'mock_vs_non_mock': 0}
+        collisions = []
+        for key, losers in self.losers.items():
+            _, record, source = self.winners[key]
+            record = CutoffRecord._make(record)
+            sources = {source} | {loser_source for _, loser_source in losers}
+            kinds['same_file' if len(sources) == 1 else 'cross_file'] += 1
+            if len({'mock' in name.lower() for name in sources}) == 2:
+                kinds['mock_vs_non_mock'] += 1
+            collisions.append({
+                'key': dict(zip(UPSERT_KEY, key)),
+                'kept': {'cutoff_rank': record.cutoff_rank, 'source': source},
+                'dropped': [{'cutoff_rank': rank, 'source': loser_source} for rank, loser_source in losers]
+            })
+        return {
+            'policy': self.policy,
+            'records_in': self.records_in,
+            'records_out': len(self.winners),
+            'colliding_keys': len(self.losers),
+            'by_kind': kinds,
+            'collisions': collisions
+        }
+
+class ShardedWriter:
+    """Streams records to one NDJSON shard per (year, round) plus an index file
+    
+    Shards and the index are written to temporary files and swapped in on
+    close, so readers never see a half-written dataset. Shards from earlier
+    runs that are no longer produced are removed once the new index is live.
+    """
+    
+    def __init__(self, out_dir: Path):
+        self.out_dir = out_dir
+        self.index_file = out_dir / 'index.json'
+        self.handles: Dict[Tuple[str, str], Any] = {}
+        self.counts: Dict[Tuple[str, str], int] = {}
+    
+    @staticmethod
+    def shard_name(year: str, round_type: str) -> str:
+        return f"cutoffs-{year}-{round_type}.ndjson"
+    
+    def write(self, records: Iterable[CutoffRecord]):
+        """Append records to their shards"""
+        for record in records:
+            shard = (record['year'], record['round'])
+            handle = self.handles.get(shard)
+            if handle is None:
+                self.out_dir.mkdir(parents=True, exist_ok=True)
+                handle = open(self.out_dir / (self.shard_name(*shard) + '.tmp'), 'w', encoding='utf-8')
+                self.handles[shard] = handle
+                self.counts[shard] = 0
+            handle.write(json.dumps(record._asdict(), ensure_ascii=False, separators=(',', ':')))
+            handle.write('\n')
+            self.counts[shard] += 1
+    
+    def close(self, metadata: Dict[str, Any]) -> Path:
+        """Publish the shards and write the index"""
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        for shard, handle in self.handles.items():
+            handle.close()
+            shard_file = self.out_dir / self.shard_name(*shard)
+            os.replace(shard_file.with_name(shard_file.name + '.tmp'), shard_file)
         
-        logger.info(f"Extracted {len(all_results)} records from {os.path.basename(file_path)}")
-        return all_results
+        index = {
+            "metadata": metadata,
+            "shards": [
+                {"file": self.shard_name(year, round_type), "year": year, "round": round_type,
+                 "records": self.counts[(year, round_type)]}
+                for year, round_type in sorted(self.handles)
+            ]
+        }
+        self.write_index(index)
         
-    except Exception as e:
-        logger.error(f"Error processing {file_path}: {str(e)}")
-        return []
+        live = {self.shard_name(*shard) for shard in self.handles}
+        for stale in self.out_dir.glob('cutoffs-*.ndjson'):
+            if stale.name not in live:
+                stale.unlink()
+        return self.index_file
+    
+    def write_index(self, index: Dict[str, Any]):
+        """Replace the index file in one step"""
+        tmp_file = self.index_file.with_name(self.index_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_file, self.index_file)
+    
+    def upsert(self, records: Iterable[CutoffRecord], metadata: Dict[str, Any],
+               groups: Optional[Iterable[Tuple[str, str]]] = None
+               ) -> Tuple[Dict[Tuple[str, str], List[CutoffRecord]], Dict[str, Any]]:
+        """Merge records into the published shards, replacing existing records with the same key
+        
+        Only the shards that receive records are read and rewritten, and the
+        lines they keep are copied through verbatim. If groups is given, the
+        records are the full new contents of those (year, round) shards, which
+        are replaced outright, and removed if left empty. Returns the full
+        contents of the rewritten shards and the metadata written to the index.
+        """
+        incoming: Dict[Tuple[str, str], List[CutoffRecord]] = {group: [] for group in groups or []}
+        for record in records:
+            incoming.setdefault((record['year'], record['round']), []).append(record)
+        
+        shards = {}
+        if self.index_file.exists():
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                shards = {(shard['year'], shard['round']): shard for shard in json.load(f)['shards']}
+        
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        merged = {}
+        removed = []
+        for shard, new_records in incoming.items():
+            keys = {record_key(record) for record in new_records}
+            shard_file = self.out_dir / self.shard_name(*shard)
+            merged[shard] = []
+            if groups is not None and not new_records:
+                shards.pop(shard, None)
+                removed.append(shard_file)
+                continue
+            tmp_file = shard_file.with_name(shard_file.name + '.tmp')
+            contents = []
+            with open(tmp_file, 'w', encoding='utf-8') as out:
+                if shard_file.exists() and groups is None:
+                    with open(shard_file, 'r', encoding='utf-8') as f:
+                        for line in f:
+                            if not line.strip():
+                                continue
+                            record = CutoffRecord(**json.loads(line))
+                            if record_key(record) in keys:
+                                continue
+                            out.write(line if line.endswith('\n') else line + '\n')
+                            contents.append(record)
+                for record in new_records:
+                    out.write(json.dumps(record._asdict(), ensure_ascii=False, separators=(',', ':')))
+                    out.write('\n')
+                contents.extend(new_records)
+            os.replace(tmp_file, shard_file)
+            shards[shard] = {"file": shard_file.name, "year": shard[0], "round": shard[1], "records": len(contents)}
+            merged[shard] = contents
+        
+        metadata = dict(metadata, total_entries=sum(shard['records'] for shard in shards.values()))
+        self.write_index({"metadata": metadata, "shards": [shards[shard] for shard in sorted(shards)]})
+        for shard_file in removed:
+            if shard_file.exists():
+                shard_file.unlink()
+        return merged, metadata
+
+class JsonWriter:
+    """Streams records into a single compact cutoffs.json"""
+    
+    def __init__(self, out_file: Path):
+        self.out_file = out_file
+        self.tmp_file = out_file.with_name(out_file.name + '.tmp')
+        out_file.parent.mkdir(parents=True, exist_ok=True)
+        self.handle = open(self.tmp_file, 'w', encoding='utf-8')
+        self.handle.write('{"cutoffs":[')
+        self.count = 0
+    
+    def write(self, records: Iterable[CutoffRecord]):
+        """Append records to the cutoffs array"""
+        for record in records:
+            if self.count:
+                self.handle.write(',')
+            self.handle.write(json.dumps(record._asdict(), ensure_ascii=False, separators=(',', ':')))
+            self.count += 1
+    
+    def close(self, metadata: Dict[str, Any]) -> Path:
+        """Finish the document with its metadata and publish it"""
+        self.handle.write('],"metadata":')
+        self.handle.write(json.dumps(metadata, ensure_ascii=False, separators=(',', ':')))
+        self.handle.write('}')
+        self.handle.close()
+        os.replace(self.tmp_file, self.out_file)
+        return self.out_file
+
+class AggregateCube:
+    """Running cutoff-rank aggregates per (year, round, category, course, institute) cell
+    
+    Fed record batches as they are produced, so summaries never need a rescan of
+    the raw dataset. Written out as count/min/median/max per cell plus per-dimension
+    record counts. Once deduplicated, a full cell holds a single record, so the
+    cube also rolls cells up over colleges and over courses.
+    """
+    
+    DIMENSIONS = ['year', 'round', 'category', 'course', 'institute_code']
+    MEASURES = ['count', 'min', 'median', 'max']
+    # Coarser cells, each the full key without one dimension
+    ROLLUPS = {
+        'course': ['year', 'round', 'category', 'course'],
+        'institute': ['year', 'round', 'category', 'institute_code']
+    }
+    
+    def __init__(self, out_file: Path):
+        self.out_file = out_file
+        self.cells: Dict[Tuple[str, ...], List[int]] = {}
+    
+    def write(self, records: Iterable[CutoffRecord]):
+        """Add records to their cells"""
+        for record in records:
+            key = (record['year'], record['round'], record['category'], record['course'], record['institute_code'])
+            ranks = self.cells.get(key)
+            if ranks is None:
+                ranks = self.cells[key] = []
+            ranks.append(record['cutoff_rank'])
+    
+    def rollup(self, dimension: str) -> Dict[str, int]:
+        """Record counts by one dimension, in order of first appearance"""
+        position = self.DIMENSIONS.index(dimension)
+        counts: Dict[str, int] = {}
+        for key, ranks in self.cells.items():
+            counts[key[position]] = counts.get(key[position], 0) + len(ranks)
+        return counts
+    
+    def rollup_cells(self, dimensions: List[str]) -> Dict[Tuple[str, ...], List[int]]:
+        """Ranks of the cells grouped by a subset of the dimensions"""
+        positions = [self.DIMENSIONS.index(dimension) for dimension in dimensions]
+        cells: Dict[Tuple[str, ...], List[int]] = {}
+        for key, ranks in self.cells.items():
+            rollup_key = tuple(key[position] for position in positions)
+            rollup_ranks = cells.get(rollup_key)
+            if rollup_ranks is None:
+                rollup_ranks = cells[rollup_key] = []
+            rollup_ranks.extend(ranks)
+        return cells
+    
+    @staticmethod
+    def measure(cells: Dict[Tuple[str, ...], List[int]]) -> List[list]:
+        """Cells as [*key, count, min, median, max] rows, sorted by key"""
+        return [
+            [*key, len(ranks), min(ranks), statistics.median(ranks), max(ranks)]
+            for key, ranks in sorted(cells.items())
+        ]
+    
+    def close(self, metadata: Dict[str, Any]) -> Path:
+        """Write the cube"""
+        cube = {
+            "metadata": metadata,
+            "dimensions": self.DIMENSIONS,
+            "measures": self.MEASURES,
+            "totals": {dimension: dict(sorted(self.rollup(dimension).items())) for dimension in self.DIMENSIONS},
+            "cells": self.measure(self.cells),
+            "rollups": {
+                name: {"dimensions": dimensions, "cells": self.measure(self.rollup_cells(dimensions))}
+                for name, dimensions in self.ROLLUPS.items()
+            }
+        }
+        self.out_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.out_file.with_name(self.out_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(cube, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, self.out_file)
+        return self.out_file
+
+def upsert_outputs(out_dir: Path, records: List[CutoffRecord], columnar: bool, total_files: int,
+                   groups: Optional[Iterable[Tuple[str, str]]] = None) -> Dict[str, Any]:
+    """Upsert records into the sharded dataset and rebuild the files derived from it
+    
+    With groups, the records replace those (year, round) groups outright (see
+    ShardedWriter.upsert). Records of untouched groups are taken from the
+    current rank index, so their shards are neither parsed nor rewritten.
+    """
+    from cutoff_columnar import ColumnarWriter, load_columnar
+    from cutoff_index import INDEX_NAME, RankIndex, RankIndexWriter, iter_shard_records
+    
+    try:
+        old_index = RankIndex(load_columnar(out_dir / INDEX_NAME))
+    except (OSError, ValueError):
+        old_index = None
+    
+    sharded = ShardedWriter(out_dir / 'cutoffs')
+    merged, metadata = sharded.upsert(records, {
+        "last_updated": datetime.now().isoformat(),
+        "total_files_processed": total_files
+    }, groups)
+    
+    # Materialized before the index file it is mapped from gets replaced
+    if old_index is not None:
+        untouched = [CutoffRecord(**record) for record in old_index.iter_records(skip=merged)]
+    else:
+        untouched = [CutoffRecord(**record) for record in iter_shard_records(out_dir)
+                     if (record['year'], record['round']) not in merged]
+    
+    writers = [RankIndexWriter(out_dir / INDEX_NAME), AggregateCube(out_dir / 'cutoffs-cube.json')]
+    if columnar:
+        writers.append(ColumnarWriter(out_dir / 'cutoffs'))
+    for writer in writers:
+        writer.write(untouched)
+        for shard_records in merged.values():
+            writer.write(shard_records)
+        writer.close(metadata)
+    return metadata
+
+def snapshot_inputs(root_dir: Path, pattern: str) -> Dict[Path, Tuple[int, int]]:
+    """Modification time and size of every input file"""
+    snapshot = {}
+    for path in root_dir.glob(pattern):
+        try:
+            stat = path.stat()
+        except OSError:  # Removed between the glob and the stat
+            continue
+        snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+def wait_for_changes(root_dir: Path, pattern: str, seen: Dict[Path, Tuple[int, int]], interval: float,
+                     debounce: float) -> Tuple[List[Path], Dict[Path, Tuple[int, int]]]:
+    """Poll until input files are new or modified, then until they have been quiet for the debounce window
+    
+    Returns the changed files and the snapshot they were taken from.
+    """
+    current = seen
+    while all(seen.get(path) == state for path, state in current.items()):
+        time.sleep(interval)
+        current = snapshot_inputs(root_dir, pattern)
+    
+    # Files that land together (or are still being copied) end up in one batch
+    quiet_since = time.monotonic()
+    while time.monotonic() - quiet_since < debounce:
+        time.sleep(min(interval, debounce))
+        latest = snapshot_inputs(root_dir, pattern)
+        if latest != current:
+            current = latest
+            quiet_since = time.monotonic()
+    
+    changed = sorted(path for path, state in current.items() if seen.get(path) != state)
+    return changed, current
 
-def main():
-    """Main function to extract data from all Excel files"""
-    # Get current directory
-    root_dir = Path.cwd()
-    excel_files = list(root_dir.glob('*.xlsx'))
+def resolve_upsert_records(extracted: Dict[Path, RecordBatch], others: Dict[Path, RecordBatch], policy: str,
+                           previous: Iterable[Tuple[str, str]] = ()
+                           ) -> Tuple[List[CutoffRecord], Optional[Set[Tuple[str, str]]]]:
+    """The records to upsert for freshly extracted inputs, with conflicts resolved as a full run would
     
-    if not excel_files:
-        logger.error('No Excel files found in project root.')
+    With a conflict policy, the records of every other current input that fall
+    into the (year, round) groups touched by the new records (or by previous,
+    the groups the inputs used to yield) compete as well, in the same file
+    order as a full run. The published record of a key may have beaten records
+    that were never published, so comparing against it alone is not enough.
+    
+    Returns the records and, with a policy, the groups they are the full
+    contents of; without one they are merged into the published groups by key.
+    """
+    if policy == 'none':
+        return [record for input_file in sorted(extracted) for record in extracted[input_file]], None
+    
+    touched = set(previous).union(*(records.groups() for records in extracted.values()))
+    all_records = {**others, **extracted}
+    dedup = Deduplicator(policy)
+    for input_file in sorted(all_records):
+        dedup.add((record for record in all_records[input_file] if (record.year, record.round) in touched), input_file)
+    return list(dedup.records()), touched
+
+def watch_inputs(args: argparse.Namespace, root_dir: Path, out_dir: Path, cache: Optional[ExtractionCache],
+                 jobs: int, seen: Dict[Path, Tuple[int, int]], batches: Dict[Path, RecordBatch]):
+    """Keep polling the inputs and upsert the records of new or modified files until interrupted
+    
+    batches holds the records of every published input and is kept up to date,
+    so conflicts are resolved without re-reading untouched inputs.
+    """
+    pattern = SOURCE_PATTERNS[args.source]
+    logger.info(f"Watching {root_dir / pattern} every {args.poll_interval}s "
+                f"(debounce {args.debounce}s); press Ctrl+C to stop")
+    try:
+        while True:
+            changed, current = wait_for_changes(root_dir, pattern, seen, args.poll_interval, args.debounce)
+            removed = sorted(path.name for path in seen if path not in current)
+            if removed:
+                logger.warning(f"Removed inputs keep their published records: {', '.join(removed)}")
+            seen = current
+            if not changed:
+                continue
+            logger.info(f"Changed inputs: {', '.join(path.name for path in changed)}")
+            
+            extracted = {}
+            for changed_file, results, _ in iter_file_results(changed, cache, jobs, args.split_sheets, False):
+                if results is not None and len(results):
+                    extracted[changed_file] = results
+            # Failed and removed inputs keep their published records, so they still compete with them
+            others = {path: records for path, records in batches.items() if path not in extracted}
+            previous = set().union(*(batches[path].groups() for path in extracted if path in batches))
+            records, groups = resolve_upsert_records(extracted, others, args.dedup,
+                                                     previous) if extracted else ([], None)
+            if not records:
+                logger.warning('No records extracted from the changed inputs; published data left as is')
+                continue
+            
+            batches.update(extracted)
+            metadata = upsert_outputs(out_dir, records, args.columnar, len(seen), groups)
+            logger.info(f"Upserted {len(records)} records; dataset now holds {metadata['total_entries']} entries")
+    except KeyboardInterrupt:
+        logger.info('Stopped watching')
+
+# Readers for the published dataset; stdlib only, so stats, query and validate start fast
+ROUNDS = ['R1', 'R2', 'EXT', 'MOCK']
+INSTITUTE_CODE_PATTERN = re.compile(r'^E\d{3}$')
+YEAR_PATTERN = re.compile(r'^20\d{2}$')
+
+def read_dataset_index(data_dir: Path) -> Optional[Dict[str, Any]]:
+    """The index.json of the sharded dataset, or None if the dataset is not sharded"""
+    index_file = data_dir / 'cutoffs' / 'index.json'
+    if not index_file.exists():
+        return None
+    with open(index_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def read_dataset_metadata(data_dir: Path) -> Dict[str, Any]:
+    """Metadata of the published dataset, sharded or single-file"""
+    shard_index = read_dataset_index(data_dir)
+    if shard_index is not None:
+        return shard_index['metadata']
+    json_file = data_dir / 'cutoffs.json'
+    if not json_file.exists():
+        raise FileNotFoundError(f"No dataset in {data_dir}; run the extract command first")
+    with open(json_file, 'r', encoding='utf-8') as f:
+        return json.load(f)['metadata']
+
+def iter_dataset(data_dir: Path, shard: Optional[Tuple[str, str]] = None,
+                 line_filter: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Stream the records of the published dataset, optionally of one (year, round) only
+    
+    With line_filter, shard lines that do not contain it are skipped without
+    being parsed; the caller still checks the parsed fields.
+    """
+    shard_index = read_dataset_index(data_dir)
+    if shard_index is None:
+        json_file = data_dir / 'cutoffs.json'
+        if not json_file.exists():
+            raise FileNotFoundError(f"No dataset in {data_dir}; run the extract command first")
+        with open(json_file, 'r', encoding='utf-8') as f:
+            records = json.load(f)['cutoffs']
+        yield from (record for record in records if shard is None or (record['year'], record['round']) == shard)
         return
     
-    logger.info(f"Found {len(excel_files)} Excel files to process")
+    for entry in shard_index['shards']:
+        if shard is not None and (entry['year'], entry['round']) != shard:
+            continue
+        with open(data_dir / 'cutoffs' / entry['file'], 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip() and (line_filter is None or line_filter in line):
+                    yield json.loads(line)
+
+def dataset_stats(data_dir: Path, top: int = 10) -> Dict[str, Any]:
+    """Record counts of the published dataset by year, round, category, college and branch
     
-    all_results = []
-    processed_files = 0
+    Read from the aggregate cube when it matches the dataset, otherwise
+    computed with one pass over the records.
+    """
+    metadata = read_dataset_metadata(data_dir)
+    totals = None
+    cube_file = data_dir / 'cutoffs-cube.json'
+    if cube_file.exists():
+        with open(cube_file, 'r', encoding='utf-8') as f:
+            cube = json.load(f)
+        if cube['metadata'].get('last_updated') == metadata.get('last_updated'):
+            totals = cube['totals']
+    if totals is None:
+        cube = AggregateCube(cube_file)
+        cube.write(iter_dataset(data_dir))
+        totals = {dimension: dict(sorted(cube.rollup(dimension).items())) for dimension in AggregateCube.DIMENSIONS}
     
-    for excel_file in excel_files:
+    shard_index = read_dataset_index(data_dir)
+    return {
+        'metadata': metadata,
+        'shards': shard_index['shards'] if shard_index is not None else None,
+        'by_year': totals['year'],
+        'by_round': totals['round'],
+        'by_category': totals['category'],
+        'top_colleges': sorted(totals['institute_code'].items(), key=lambda x: x[1], reverse=True)[:top],
+        'top_branches': sorted(totals['course'].items(), key=lambda x: x[1], reverse=True)[:top]
+    }
+
+def query_dataset(data_dir: Path, rank: int, category: str, year: str, round_type: str,
+                  course: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Options a candidate of the given rank could have got, closest cutoff first
+    
+    Same answer as the rank index's eligible(), read straight from the
+    (year, round) shard so no numpy is needed.
+    """
+    # Shard lines are written compactly, so this substring is present in every matching line
+    line_filter = json.dumps({'category': category}, separators=(',', ':'))[1:-1]
+    results = [record for record in iter_dataset(data_dir, (str(year), round_type), line_filter)
+               if record['category'] == category and record['cutoff_rank'] >= rank
+               and (course is None or record['course'] == course)]
+    results.sort(key=lambda record: record['cutoff_rank'])
+    return results[:limit] if limit is not None else results
+
+def validate_dataset(data_dir: Path, max_examples: int = 10) -> Dict[str, Any]:
+    """Check the published dataset and its derived files for consistency
+    
+    Errors are problems with the dataset itself (bad or misfiled records,
+    counts that disagree with the index); warnings are duplicate keys and
+    derived files that are out of date.
+    """
+    errors: Dict[str, List[str]] = {}
+    warnings: Dict[str, List[str]] = {}
+    
+    def report(problems: Dict[str, List[str]], kind: str, message: str):
+        problems.setdefault(kind, [])
+        if len(problems[kind]) < max_examples:
+            problems[kind].append(message)
+    
+    fields = set(CutoffRecord._fields)
+    courses = set(BRANCH_MAPPING.values()) | set(BRANCH_VARIATIONS.values())
+    categories = set(CATEGORY_MAPPING.values())
+    metadata = read_dataset_metadata(data_dir)
+    shard_index = read_dataset_index(data_dir)
+    keys = set()
+    duplicates = 0
+    total = 0
+    counts: Dict[Tuple[str, str], int] = {}
+    
+    records = iter_dataset(data_dir)
+    while True:
         try:
-            results = extract_from_excel(str(excel_file))
-            all_results.extend(results)
-            processed_files += 1
-        except Exception as e:
-            logger.error(f"Failed to process {excel_file.name}: {str(e)}")
-    
-    # Create output directory
-    out_dir = root_dir / 'public' / 'data'
-    out_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Create the final data structure
-    final_data = {
-        "metadata": {
-            "last_updated": datetime.now().isoformat(),
-            "total_files_processed": processed_files,
-            "total_entries": len(all_results)
-        },
-        "cutoffs": all_results
+            record = next(records, None)
+        except json.JSONDecodeError as e:
+            # The stream cannot resume after a broken line
+            report(errors, 'json', f"after record {total}: {e}")
+            break
+        if record is None:
+            break
+        total += 1
+        where = f"record {total}"
+        if not isinstance(record, dict) or set(record) != fields:
+            report(errors, 'fields', f"{where}: fields {sorted(record) if isinstance(record, dict) else record!r}")
+            continue
+        rank = record['cutoff_rank']
+        if not isinstance(rank, int) or isinstance(rank, bool) or not 0 < rank < 200000:
+            report(errors, 'cutoff_rank', f"{where}: cutoff_rank {rank!r}")
+        if not INSTITUTE_CODE_PATTERN.match(str(record['institute_code'])):
+            report(errors, 'institute_code', f"{where}: institute_code {record['institute_code']!r}")
+        if record['course'] not in courses:
+            report(errors, 'course', f"{where}: course {record['course']!r}")
+        if record['category'] not in categories:
+            report(errors, 'category', f"{where}: category {record['category']!r}")
+        if not YEAR_PATTERN.match(str(record['year'])):
+            report(errors, 'year', f"{where}: year {record['year']!r}")
+        if record['round'] not in ROUNDS:
+            report(errors, 'round', f"{where}: round {record['round']!r}")
+        
+        shard = (record['year'], record['round'])
+        counts[shard] = counts.get(shard, 0) + 1
+        key = record_key(record)
+        if key in keys:
+            duplicates += 1
+            report(warnings, 'duplicate_key', f"{where}: duplicate key {key}")
+        keys.add(key)
+    
+    # Counts recorded in the index must match what the shards hold
+    if shard_index is not None:
+        for entry in shard_index['shards']:
+            shard = (entry['year'], entry['round'])
+            if entry['file'] != ShardedWriter.shard_name(*shard):
+                report(errors, 'shard_file', f"{entry['file']} is listed for {shard}")
+            if counts.get(shard, 0) != entry['records']:
+                report(errors, 'shard_count', f"{entry['file']}: index says {entry['records']} records, "
+                                              f"shard holds {counts.get(shard, 0)} for {shard}")
+        listed = {ShardedWriter.shard_name(entry['year'], entry['round']) for entry in shard_index['shards']}
+        for stray in sorted((data_dir / 'cutoffs').glob('cutoffs-*.ndjson')):
+            if stray.name not in listed:
+                report(warnings, 'unlisted_shard', f"{stray.name} is not in the index")
+    if metadata.get('total_entries') != total:
+        report(errors, 'total_entries', f"metadata says {metadata.get('total_entries')} entries, dataset holds {total}")
+    
+    # Derived files are rewritten with the dataset's metadata on every run
+    for name in ['rank-index.columns.json', 'cutoffs-cube.json']:
+        derived = data_dir / name
+        if not derived.exists():
+            report(warnings, 'derived_missing', f"{name} is missing")
+            continue
+        with open(derived, 'r', encoding='utf-8') as f:
+            derived_metadata = json.load(f)['metadata']
+        if derived_metadata.get('last_updated') != metadata.get('last_updated'):
+            report(warnings, 'derived_stale', f"{name} was built for the dataset of {derived_metadata.get('last_updated')}")
+    
+    return {
+        'data_dir': str(data_dir),
+        'records': total,
+        'shards': {f"{year}-{round_type}": count for (year, round_type), count in sorted(counts.items())},
+        'duplicate_keys': duplicates,
+        'valid': not errors,
+        'errors': errors,
+        'warnings': warnings
+    }
+
+COMMANDS = ['extract', 'stats', 'query', 'validate']
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments; without a command, the arguments are those of extract"""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in COMMANDS + ['-h', '--help']:
+        argv.insert(0, 'extract')
+    
+    parser = argparse.ArgumentParser(description='Extract, summarize, query and validate KCET cutoff data')
+    commands = parser.add_subparsers(dest='command', required=True, metavar='{' + ','.join(COMMANDS) + '}')
+    
+    extract = commands.add_parser('extract', help='Extract cutoffs from Excel workbooks or PDF text dumps (default)',
+                                  description='Extract KCET cutoff data from Excel workbooks or PDF text dumps')
+    extract.add_argument('inputs', nargs='*', type=Path,
+                         help='Input files to extract (default: every --source input under --input-dir). '
+                              'If --out-dir already holds a sharded dataset, their records are upserted into it '
+                              'rather than replacing it')
+    extract.add_argument('--input-dir', type=Path, default=Path('.'),
+                         help='Directory searched for inputs: *.xlsx for excel, public/data/raw/*.pdf.txt '
+                              'for text (default: current directory)')
+    extract.add_argument('--out-dir', type=Path, default=Path('public/data'),
+                         help='Directory the dataset and its derived files are written to (default: public/data)')
+    extract.add_argument('--source', choices=list(SOURCE_PATTERNS), default='excel',
+                         help='excel: *.xlsx workbooks; text: PDF text dumps (default: excel)')
+    extract.add_argument('--jobs', '-j', type=int, default=1,
+                         help='Number of worker processes (0 = one per CPU, default: 1)')
+    extract.add_argument('--split-sheets', action='store_true',
+                         help='Distribute individual sheets instead of whole workbooks across workers')
+    extract.add_argument('--format', choices=['ndjson', 'json'], default='ndjson',
+                         help='ndjson: one shard per year/round under <out-dir>/cutoffs/ with an index.json; '
+                              'json: a single compact <out-dir>/cutoffs.json (default: ndjson)')
+    extract.add_argument('--columnar', action='store_true',
+                         help='Also write the dictionary-encoded columnar dataset (<out-dir>/cutoffs.columns.json/.bin)')
+    extract.add_argument('--dedup', choices=DEDUP_POLICIES + ['none'], default='prefer-non-mock',
+                         help='Keep one record per (institute_code, course, category, year, round), resolving '
+                              'collisions by this policy; none keeps every record (default: prefer-non-mock)')
+    extract.add_argument('--dedup-report', type=Path, default=None,
+                         help='Write a JSON report of every dedup collision')
+    extract.add_argument('--watch', action='store_true',
+                         help='After the full run, keep polling --input-dir for new or modified inputs and upsert '
+                              'their records into the sharded dataset (requires --format ndjson)')
+    extract.add_argument('--poll-interval', type=float, default=2.0,
+                         help='Seconds between polls in --watch mode (default: 2)')
+    extract.add_argument('--debounce', type=float, default=5.0,
+                         help='Seconds inputs must stay unchanged before a --watch batch is extracted (default: 5)')
+    extract.add_argument('--metrics-out', type=Path, default=None,
+                         help='Write a JSON report of per-file and per-sheet timings, row counts and drops')
+    extract.add_argument('--profile', action='store_true',
+                         help='Also trace memory peaks and dump a cProfile per extraction task to --profile-dir')
+    extract.add_argument('--profile-dir', type=Path, default=Path('.cache/profile'),
+                         help='Where --profile writes its .prof files and, without --metrics-out, '
+                              'metrics.json (default: .cache/profile)')
+    extract.add_argument('--cache-dir', type=Path, default=Path('.cache/cutoffs'),
+                         help='Directory for cached per-workbook extractions (default: .cache/cutoffs)')
+    extract.add_argument('--force', action='store_true',
+                         help='Re-extract every workbook, ignoring cached results')
+    extract.add_argument('--no-cache', action='store_true',
+                         help='Neither read nor write the extraction cache (not with explicit inputs upserted '
+                              'under a dedup policy, which read the other inputs from it)')
+    
+    stats = commands.add_parser('stats', help='Summarize the extracted dataset',
+                                description='Record counts of the extracted dataset as JSON')
+    stats.add_argument('--data-dir', type=Path, default=Path('public/data'), help='Extractor output directory')
+    stats.add_argument('--top', type=int, default=10, help='Number of top colleges and branches (default: 10)')
+    
+    query = commands.add_parser('query', help='List the options a rank could have got',
+                                description='Options a candidate of the given rank could have got, closest cutoff first')
+    query.add_argument('--data-dir', type=Path, default=Path('public/data'), help='Extractor output directory')
+    query.add_argument('--rank', type=int, required=True, help='Candidate rank')
+    query.add_argument('--category', required=True, help='Seat category, e.g. GM, 2AG')
+    query.add_argument('--year', required=True, help='Cutoff year')
+    query.add_argument('--round', dest='round_type', default='R1', help='Round: R1, R2, EXT or MOCK (default: R1)')
+    query.add_argument('--course', default=None, help='Only this branch code, e.g. CS')
+    query.add_argument('--limit', type=int, default=None, help='Maximum number of options to return')
+    
+    validate = commands.add_parser('validate', help='Check the extracted dataset for consistency',
+                                   description='Check the extracted dataset and its derived files; '
+                                               'exits non-zero if there are errors')
+    validate.add_argument('--data-dir', type=Path, default=Path('public/data'), help='Extractor output directory')
+    validate.add_argument('--strict', action='store_true', help='Treat warnings as errors')
+    validate.add_argument('--report', type=Path, default=None, help='Also write the full report as JSON')
+    
+    args = parser.parse_args(argv)
+    if args.command == 'extract' and args.watch:
+        if args.format != 'ndjson':
+            parser.error('--watch upserts into the sharded dataset and requires --format ndjson')
+        if args.inputs:
+            parser.error('--watch polls --input-dir and cannot be combined with explicit input files')
+    return args
+
+def run_extract(args: argparse.Namespace) -> Optional[int]:
+    """Extract data from all input files; non-zero exit status if there are none"""
+    from cutoff_columnar import ColumnarWriter
+    from cutoff_index import INDEX_NAME, RankIndexWriter
+    
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    
+    root_dir = args.input_dir.resolve()
+    pattern = SOURCE_PATTERNS[args.source]
+    # Taken before the run so that files landing during it are picked up by --watch
+    seen = snapshot_inputs(root_dir, pattern) if args.watch else {}
+    if args.inputs:
+        missing = [str(path) for path in args.inputs if not path.is_file()]
+        if missing:
+            logger.error(f"Input files not found: {', '.join(missing)}")
+            return 1
+        excel_files = [path.resolve() for path in args.inputs]
+    else:
+        excel_files = sorted(root_dir.glob(pattern))
+    
+    if not excel_files and not args.watch:
+        logger.error(f"No {args.source} input files found ({root_dir / pattern}).")
+        return 1
+    
+    logger.info(f"Found {len(excel_files)} input files to process")
+    
+    # Explicit inputs are merged into an existing dataset, never written over it
+    out_dir = args.out_dir
+    if args.inputs and (read_dataset_index(out_dir) is not None or (out_dir / 'cutoffs.json').exists()):
+        if args.format != 'ndjson' or read_dataset_index(out_dir) is None:
+            logger.error(f"Explicit inputs are upserted into the sharded dataset, and {out_dir} holds a single-file "
+                         f"dataset or --format json was given; pass an --out-dir without a dataset instead")
+            return 1
+        cache = None if args.no_cache else ExtractionCache(args.cache_dir)
+        return upsert_inputs(args, excel_files, root_dir, cache, jobs)
+    
+    # Records are streamed to the output as each workbook finishes
+    writers = [JsonWriter(out_dir / 'cutoffs.json') if args.format == 'json' else ShardedWriter(out_dir / 'cutoffs')]
+    if args.columnar:
+        writers.append(ColumnarWriter(out_dir / 'cutoffs'))
+    # The rank index is rebuilt on every run so it always matches the dataset
+    writers.append(RankIndexWriter(out_dir / INDEX_NAME))
+    # Summary aggregates are built while the records stream past
+    cube = AggregateCube(out_dir / 'cutoffs-cube.json')
+    writers.append(cube)
+    
+    cache = None if args.no_cache else ExtractionCache(args.cache_dir)
+    
+    total_records = 0
+    processed_files = 0
+    file_metrics = []
+    # --watch resolves later conflicts against the records of every published input, kept from here on
+    batches: Dict[Path, RecordBatch] = {}
+    # Deduplication needs every record of a key, so with a policy the writers get the records at the end
+    dedup = Deduplicator(args.dedup) if args.dedup != 'none' else None
+    run_wall_start, run_cpu_start = time.perf_counter(), time.process_time()
+    profile_dir = args.profile_dir.resolve() if args.profile else None
+    
+    for excel_file, results, metrics in iter_file_results(excel_files, cache, jobs, args.split_sheets,
+                                                          args.force, profile_dir):
+        file_metrics.append(metrics)
+        if results is None:
+            continue
+        processed_files += 1
+        if args.watch:
+            batches[excel_file] = results
+        if dedup is not None:
+            dedup.add(results, excel_file)
+            continue
+        total_records += len(results)
+        for writer in writers:
+            writer.write(results)
+    
+    if dedup is not None:
+        deduped = RecordBatch(dedup.records())
+        total_records = len(deduped)
+        for writer in writers:
+            writer.write(deduped)
+        dedup_report = dedup.report()
+        logger.info(f"Deduplicated {dedup_report['records_in']} records into {dedup_report['records_out']} "
+                    f"({dedup_report['colliding_keys']} colliding keys, policy {args.dedup}): {dedup_report['by_kind']}")
+        if args.dedup_report is not None:
+            args.dedup_report.parent.mkdir(parents=True, exist_ok=True)
+            with open(args.dedup_report, 'w', encoding='utf-8') as f:
+                json.dump(dedup_report, f, indent=2, ensure_ascii=False)
+            logger.info(f"Dedup report saved to: {args.dedup_report}")
+    
+    metadata = {
+        "last_updated": datetime.now().isoformat(),
+        "total_files_processed": processed_files,
+        "total_entries": total_records
     }
+    out_files = [writer.close(metadata) for writer in writers]
     
-    # Save the extracted data
-    out_file = out_dir / 'cutoffs.json'
-    with open(out_file, 'w', encoding='utf-8') as f:
-        json.dump(final_data, f, indent=2, ensure_ascii=False)
+    metrics_out = args.metrics_out or (profile_dir / 'metrics.json' if profile_dir is not None else None)
+    if metrics_out is not None:
+        report = build_metrics_report(file_metrics, {
+            **metadata,
+            'jobs': jobs,
+            'split_sheets': args.split_sheets,
+            'profile': args.profile,
+            'wall_seconds': time.perf_counter() - run_wall_start,
+            'main_cpu_seconds': time.process_time() - run_cpu_start
+        })
+        metrics_out.parent.mkdir(parents=True, exist_ok=True)
+        with open(metrics_out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Metrics saved to: {metrics_out}")
     
     logger.info(f"\nExtraction complete!")
     logger.info(f"Total files processed: {processed_files}")
-    logger.info(f"Total records extracted: {len(all_results)}")
-    logger.info(f"Data saved to: {out_file}")
-    
-    # Generate summary statistics
-    year_stats = {}
-    college_stats = {}
-    branch_stats = {}
-    category_stats = {}
-    round_stats = {}
-    
-    for record in all_results:
-        year_stats[record['year']] = year_stats.get(record['year'], 0) + 1
-        college_stats[record['institute_code']] = college_stats.get(record['institute_code'], 0) + 1
-        branch_stats[record['course']] = branch_stats.get(record['course'], 0) + 1
-        category_stats[record['category']] = category_stats.get(record['category'], 0) + 1
-        round_stats[record['round']] = round_stats.get(record['round'], 0) + 1
+    logger.info(f"Total records extracted: {total_records}")
+    logger.info(f"Data saved to: {', '.join(str(out_file) for out_file in out_files)}")
     
     logger.info('\nSummary Statistics:')
-    logger.info(f'By Year: {year_stats}')
-    logger.info(f'By Category: {category_stats}')
-    logger.info(f'By Round: {round_stats}')
-    logger.info(f'Top Colleges: {sorted(college_stats.items(), key=lambda x: x[1], reverse=True)[:10]}')
-    logger.info(f'Top Branches: {sorted(branch_stats.items(), key=lambda x: x[1], reverse=True)[:10]}')
+    logger.info(f'By Year: {cube.rollup("year")}')
+    logger.info(f'By Category: {cube.rollup("category")}')
+    logger.info(f'By Round: {cube.rollup("round")}')
+    logger.info(f'Top Colleges: {sorted(cube.rollup("institute_code").items(), key=lambda x: x[1], reverse=True)[:10]}')
+    logger.info(f'Top Branches: {sorted(cube.rollup("course").items(), key=lambda x: x[1], reverse=True)[:10]}')
+    
+    if args.watch:
+        watch_inputs(args, root_dir, out_dir, cache, jobs, seen, batches)
+
+def upsert_inputs(args: argparse.Namespace, files: List[Path], root_dir: Path,
+                  cache: Optional[ExtractionCache], jobs: int) -> Optional[int]:
+    """Extract explicitly named inputs and upsert their records into the published dataset
+    
+    Conflicts are resolved against the other inputs under --input-dir, read
+    from the cache, so the result is what a full run over them plus the named
+    files would publish.
+    """
+    if cache is None and args.dedup != 'none':
+        # Resolving conflicts would mean re-parsing every other input under --input-dir
+        logger.error('Upserting explicit inputs with a dedup policy reads the other inputs from the cache; '
+                     'drop --no-cache or pass --dedup none')
+        return 1
+    
+    extracted = {}
+    for input_file, results, _ in iter_file_results(files, cache, jobs, args.split_sheets, args.force):
+        if results is not None and len(results):
+            extracted[input_file] = results
+    if not extracted:
+        logger.warning('No records extracted from the given inputs; published data left as is')
+        return
+    
+    other_files = sorted(set(root_dir.glob(SOURCE_PATTERNS[args.source])) - set(files))
+    others = {}
+    if args.dedup != 'none':
+        for other_file, results, _ in iter_file_results(other_files, cache, jobs, args.split_sheets, False):
+            if results is not None:
+                others[other_file] = results
+    records, groups = resolve_upsert_records(extracted, others, args.dedup)
+    metadata = upsert_outputs(args.out_dir, records, args.columnar, len(other_files) + len(extracted), groups)
+    logger.info(f"Upserted {len(records)} records; dataset now holds {metadata['total_entries']} entries")
+
+def run_stats(args: argparse.Namespace):
+    """Print record counts of the extracted dataset"""
+    json.dump(dataset_stats(args.data_dir, args.top), sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write('\n')
+
+def run_query(args: argparse.Namespace):
+    """Print the options a candidate of the given rank could have got"""
+    results = query_dataset(args.data_dir, args.rank, args.category, args.year, args.round_type,
+                            args.course, args.limit)
+    json.dump(results, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write('\n')
+
+def run_validate(args: argparse.Namespace) -> int:
+    """Validate the extracted dataset; non-zero exit status if it has errors"""
+    report = validate_dataset(args.data_dir)
+    if args.report is not None:
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    
+    for level, problems in [(logging.ERROR, report['errors']), (logging.WARNING, report['warnings'])]:
+        for kind, examples in problems.items():
+            for example in examples:
+                logger.log(level, f"{kind}: {example}")
+    logger.info(f"Checked {report['records']} records in {len(report['shards'])} year/round groups: "
+                f"{len(report['errors'])} error kinds, {len(report['warnings'])} warning kinds")
+    failed = not report['valid'] or (args.strict and report['warnings'])
+    return 1 if failed else 0
+
+def main(argv: Optional[List[str]] = None) -> Optional[int]:
+    """Run a command; extract when none is given"""
+    args = parse_args(argv)
+    try:
+        return {'extract': run_extract, 'stats': run_stats, 'query': run_query, 'validate': run_validate}[args.command](args)
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        return 1
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())